@@ -0,0 +1,190 @@
+import FreeCAD
+import Part
+import ARTools
+import ARProfiler
+import glob
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+__title__ = "ARBatch"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Headless batch export of STEP files for the Annotations for Robotics
+workbench. Meant to be run under FreeCADCmd, e.g.:
+FreeCADCmd -c "import ARBatch; ARBatch.batchExport('~/vendor/*.step', '~/out')"
+"""
+
+STEP_EXTENSIONS = (".step", ".stp")
+
+
+###################################################################
+# Module functions
+###################################################################
+def findStepFiles(inputs):
+    """Returns a sorted list of STEP files from a directory, a glob pattern,
+    a file path, or a list of those."""
+    if not isinstance(inputs, (list, tuple)):
+        inputs = [inputs]
+    files = set()
+    for item in inputs:
+        item = os.path.expanduser(item)
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, f) for f in os.listdir(item)]
+        else:
+            candidates = glob.glob(item)
+        for c in candidates:
+            if os.path.isfile(c) and c.lower().endswith(STEP_EXTENSIONS):
+                files.add(os.path.abspath(c))
+    return sorted(files)
+
+
+def safeFileName(label):
+    """Gives a label that is safe to use as a file name."""
+    return re.sub(r"[^\w.-]", "_", label)
+
+
+def uniqueFileName(name, used, suffix=""):
+    """Gives name, or name with a number appended if it is already in used
+    (compared case insensitively), and adds the result to used."""
+    candidate = name
+    n = 1
+    while (candidate + suffix).lower() in used:
+        candidate = name + "_" + str(n)
+        n += 1
+    used.add((candidate + suffix).lower())
+    return candidate + suffix
+
+
+def openStepFile(ifile):
+    """Opens a STEP file in a new document and returns the document."""
+    import Import
+    with ARProfiler.timed("openStepFile"):
+        doc = FreeCAD.newDocument()
+        Import.insert(ifile, doc.Name)
+    return doc
+
+
+def exportStepFile(ifile, odir):
+    """Exports the part info of every part in a STEP file to its own json
+    file under odir/<stepname>/, named by label. Parts whose labels give the
+    same file name get a number appended. Returns (ifile, number of parts,
+    error)."""
+    stepname = os.path.splitext(os.path.basename(ifile))[0]
+    fdir = os.path.join(odir, safeFileName(stepname))
+    doc = None
+    nparts = 0
+    used = set()
+    try:
+        doc = openStepFile(ifile)
+        for obj in doc.Objects:
+            if isinstance(obj, Part.Feature) and not obj.Shape.isNull():
+                fname = uniqueFileName(safeFileName(obj.Label), used,
+                                       ".json")
+                ofile = os.path.join(fdir, fname)
+                ARTools.exportPartInfo(obj, ofile)
+                nparts += 1
+    except Exception as e:
+        return ifile, nparts, str(e)
+    finally:
+        if doc is not None:
+            FreeCAD.closeDocument(doc.Name)
+    return ifile, nparts, None
+
+
+def _exportStepFileWorker(args):
+    """Pool worker, unpacks the arguments to exportStepFile. If profile is
+    set, the worker's profile of the file is returned for the parent to
+    merge (see ARProfiler.Profiler.snapshot)."""
+    ifile, odir, profile = args
+    if not profile:
+        return exportStepFile(ifile, odir) + (None,)
+    profiler = ARProfiler.getProfiler()
+    profiler.reset()
+    profiler.enabled = True
+    profiler.tracing = False
+    try:
+        result = exportStepFile(ifile, odir)
+    finally:
+        profiler.enabled = False
+    return result + (profiler.snapshot(),)
+
+
+def batchExport(inputs, odir, processes=None):
+    """Exports part info of all parts in all STEP files found in inputs
+    (directory, glob pattern or list of those) to odir.
+    The files are distributed over a process pool, by default one process
+    per core. Returns a dictionary with the export statistics.
+    When profiled (see ARProfiler.session), the step times of the workers
+    are summed over all processes."""
+    with ARProfiler.session("Batch export"):
+        return _batchExport(inputs, odir, processes)
+
+
+def _batchExport(inputs, odir, processes):
+    files = findStepFiles(inputs)
+    odir = os.path.abspath(os.path.expanduser(odir))
+    if len(files) == 0:
+        FreeCAD.Console.PrintError("No STEP files found.\n")
+        return None
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(files)))
+    # A single process is profiled by the session directly
+    profile = ARProfiler.isEnabled() and processes > 1
+    jobs = [(f, odir, profile) for f in files]
+    nparts = 0
+    failed = []
+    t0 = time.time()
+    if processes == 1:
+        results = map(_exportStepFileWorker, jobs)
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(_exportStepFileWorker, jobs)
+    try:
+        for ifile, n, err, snapshot in results:
+            nparts += n
+            if snapshot is not None:
+                ARProfiler.getProfiler().merge(snapshot)
+            if err is not None:
+                failed.append(ifile)
+                FreeCAD.Console.PrintError("Failed to export " + ifile
+                                           + ": " + err + "\n")
+    finally:
+        if processes > 1:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - t0
+    stats = {"files": len(files),
+             "failed": failed,
+             "parts": nparts,
+             "processes": processes,
+             "seconds": elapsed,
+             "partspersecond": nparts/elapsed if elapsed > 0 else 0.0}
+    FreeCAD.Console.PrintMessage(
+        "Exported {0} parts from {1} files in {2:.2f} s "
+        "({3:.2f} parts/s, {4} processes)\n".format(
+            nparts, len(files) - len(failed), elapsed,
+            stats["partspersecond"], processes))
+    return stats
+
+
+def main(argv):
+    """Command line entry point: <input dir|glob>... <output dir>"""
+    if len(argv) < 2:
+        FreeCAD.Console.PrintError(
+            "Usage: ARBatch.py <input dir|glob>... <output dir>\n")
+        return 1
+    stats = batchExport(argv[:-1], argv[-1])
+    if stats is None or stats["failed"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
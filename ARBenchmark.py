@@ -0,0 +1,248 @@
+import FreeCAD
+import Part
+import ARTools
+import ARFrames
+import ARCache
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+__title__ = "ARBenchmark"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Benchmarks of the Annotations for Robotics workbench on synthetic parts and
+assemblies. Runs headless, e.g.:
+FreeCADCmd -c "import ARBenchmark; ARBenchmark.runBenchmarks('bench.json')"
+The results are written as json so runs of different versions can be
+compared. The benchmarks use their own shape cache in a temporary directory,
+and steps that use the cache are timed both cold (empty cache) and warm.
+"""
+
+# Holes per plate and parts per assembly
+HOLE_SCALES = [10, 100, 400]
+PART_SCALES = [10, 100, 400]
+
+
+###################################################################
+# Synthetic geometry
+###################################################################
+def makePlateShape(nholes, pitch=10.0, radius=2.0, thickness=5.0):
+    """Gives a plate with nholes through holes on a square grid."""
+    side = 1
+    while side*side < nholes:
+        side += 1
+    length = pitch*(side + 1)
+    plate = Part.makeBox(length, length, thickness)
+    if nholes == 0:
+        return plate
+    holes = []
+    for i in range(nholes):
+        center = FreeCAD.Vector(pitch*(i % side + 1), pitch*(i//side + 1),
+                                -1.0)
+        holes.append(Part.makeCylinder(radius, thickness + 2.0, center))
+    return plate.cut(Part.makeCompound(holes))
+
+
+def makePlate(doc, nholes, label="Plate"):
+    """Adds a plate with nholes holes to the document."""
+    obj = doc.addObject("Part::Feature", "Plate")
+    obj.Shape = makePlateShape(nholes)
+    obj.Label = label
+    return obj
+
+
+def makeAssembly(doc, nparts, nholes=4):
+    """Adds nparts plates spread out in a row to the document. The plates
+    have 1 to 2*nholes holes and differ in thickness, so no two parts share
+    a shape or a cache entry."""
+    parts = []
+    for i in range(nparts):
+        obj = doc.addObject("Part::Feature", "Plate")
+        obj.Shape = makePlateShape(1 + i % (2*nholes),
+                                   thickness=5.0 + 0.01*i)
+        obj.Placement = FreeCAD.Placement(FreeCAD.Vector(50.0*i, 0, 0),
+                                          FreeCAD.Rotation(0, 0, 5.0*i))
+        obj.Label = "Plate" + str(i)
+        parts.append(obj)
+    doc.recompute()
+    return parts
+
+
+###################################################################
+# Timing
+###################################################################
+def bestTime(setup, function, repeat=3):
+    """Gives the best wall time in seconds of function(*setup()) over
+    repeat runs. Only function is timed."""
+    best = None
+    for i in range(repeat):
+        args = setup()
+        t0 = time.time()
+        function(*args)
+        elapsed = time.time() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+class BenchmarkRun(object):
+    """Runs benchmarks in fresh documents and collects the results. The
+    shared shape cache is replaced by one in the run's temporary directory
+    until cleanup, so the results do not depend on the user's cache."""
+    def __init__(self, repeat=3):
+        self.repeat = repeat
+        self.results = []
+        self.docs = []
+        self.tmpdir = tempfile.mkdtemp(prefix="arbench")
+        self.cache = ARCache.ShapeCache(os.path.join(self.tmpdir, "cache"))
+        self.user_cache = ARCache.setShapeCache(self.cache)
+
+    def newDocument(self):
+        doc = FreeCAD.newDocument()
+        FreeCAD.setActiveDocument(doc.Name)
+        self.docs.append(doc.Name)
+        return doc
+
+    def closeDocuments(self):
+        for name in self.docs:
+            if name in FreeCAD.listDocuments():
+                FreeCAD.closeDocument(name)
+        self.docs = []
+
+    def record(self, name, scale, setup, function, count=None):
+        """Times function and records it with the size of the problem,
+        count is the number of items processed if not scale."""
+        seconds = bestTime(setup, function, self.repeat)
+        self.closeDocuments()
+        if count is None:
+            count = scale
+        result = {"name": name,
+                  "scale": scale,
+                  "seconds": seconds,
+                  "itemspersecond": count/seconds if seconds > 0 else None}
+        self.results.append(result)
+        FreeCAD.Console.PrintMessage("{0} [{1}]: {2:.4f} s\n".format(
+            name, scale, seconds))
+        return result
+
+    def ofile(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def cold(self, setup):
+        """Gives setup followed by emptying the cache."""
+        def coldSetup():
+            args = setup()
+            self.cache.clear()
+            return args
+        return coldSetup
+
+    def warm(self, setup, function):
+        """Gives setup followed by one untimed call of function on an empty
+        cache, which fills it with what function looks up."""
+        def warmSetup():
+            args = setup()
+            self.cache.clear()
+            function(*args)
+            return args
+        return warmSetup
+
+    def recordCached(self, name, scale, setup, function, count=None):
+        """Records function as "<name> cold" and "<name> warm"."""
+        self.record(name + " cold", scale, self.cold(setup), function, count)
+        self.record(name + " warm", scale, self.warm(setup, function),
+                    function, count)
+
+    def cleanup(self):
+        self.closeDocuments()
+        ARCache.setShapeCache(self.user_cache)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+###################################################################
+# Benchmarks
+###################################################################
+def benchmarkPart(run, nholes):
+    """Part property and single part export benchmarks on a plate."""
+    def plate():
+        return (makePlate(run.newDocument(), nholes),)
+
+    run.record("getLocalPartProps", nholes, plate,
+               lambda obj: ARTools.getLocalPartProps(obj, use_cache=False),
+               count=1)
+    run.recordCached("getLocalPartProps", nholes, plate,
+                     ARTools.getLocalPartProps, count=1)
+    run.recordCached("exportPartInfo", nholes, plate,
+                     lambda obj: ARTools.exportPartInfo(obj,
+                                                        run.ofile("part.json")),
+                     count=1)
+    run.recordCached("appendPartInfo", nholes, plate,
+                     lambda obj: ARTools.appendPartInfo(obj,
+                                                        run.ofile("part.json")),
+                     count=1)
+    run.record("findFeatures", nholes, plate, ARFrames.findFeatures)
+    run.record("makeFeatureFramesForPart", nholes, plate,
+               ARFrames.makeFeatureFramesForPart)
+
+
+def benchmarkAssembly(run, nparts):
+    """Assembly export and frame creation benchmarks."""
+    def assembly():
+        return (makeAssembly(run.newDocument(), nparts),)
+
+    def assemblyWithFrames():
+        parts = makeAssembly(run.newDocument(), nparts)
+        specs = []
+        for part in parts:
+            specs.extend(ARFrames.getFeatureFrameSpecs(part))
+        ARFrames.makeFeatureFrames(specs)
+        return (parts,)
+
+    def assemblyDict():
+        parts = assemblyWithFrames()[0]
+        return (ARTools.getAssemblyDict(parts),)
+
+    run.record("makeAllPartFrames", nparts, assembly,
+               lambda parts: ARFrames.makeAllPartFrames())
+    run.recordCached("exportAssembly", nparts, assemblyWithFrames,
+                     lambda parts: ARTools.exportAssembly(
+                         parts, run.ofile("asm.json")))
+    run.recordCached("exportAssemblyJSONL", nparts, assemblyWithFrames,
+                     lambda parts: ARTools.exportAssemblyJSONL(
+                         parts, run.ofile("asm.jsonl")))
+    run.record("writeJSON", nparts, assemblyDict,
+               lambda d: ARTools.writeJSON(d, run.ofile("asm.json")))
+
+
+def runBenchmarks(ofile, hole_scales=HOLE_SCALES, part_scales=PART_SCALES,
+                  repeat=3):
+    """Runs all benchmarks at all scales and writes the results to the json
+    file ofile. Returns the results."""
+    run = BenchmarkRun(repeat)
+    try:
+        for nholes in hole_scales:
+            benchmarkPart(run, nholes)
+        for nparts in part_scales:
+            benchmarkAssembly(run, nparts)
+    finally:
+        run.cleanup()
+    report = {"arbench": __version__,
+              "freecad": ".".join(FreeCAD.Version()[:3]),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "repeat": repeat,
+              "results": run.results}
+    ARTools.writeJSON(report, ofile)
+    FreeCAD.Console.PrintMessage("Benchmark results written to "
+                                 + ofile + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    runBenchmarks(sys.argv[1] if len(sys.argv) > 1 else "arbench.json")
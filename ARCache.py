@@ -0,0 +1,247 @@
+import FreeCAD
+import ARProfiler
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+__title__ = "ARCache"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Cache of expensive shape properties for the Annotations for Robotics
+workbench. Entries are keyed by a hash of the BRep content of the shape, and
+kept in an in-memory LRU tier and an on-disk tier with size based eviction.
+"""
+
+# Bump when the layout of the cached values changes
+CACHE_VERSION = "1"
+
+
+###################################################################
+# Cache
+###################################################################
+class ShapeCache(object):
+    """Two tier cache of json serializable values keyed by shape content.
+    memsize is the number of entries kept in memory, disksize the number of
+    bytes kept in cachedir. cachedir=None disables the disk tier."""
+    def __init__(self, cachedir=None, memsize=512, disksize=64*1024*1024):
+        self.cachedir = cachedir
+        self.memsize = memsize
+        self.disksize = disksize
+        self.memory = collections.OrderedDict()
+        self.disk_bytes = None
+        self.resetStats()
+
+    def resetStats(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Gives the hit/miss counters and sizes of the cache."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {"memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hitrate": float(hits)/lookups if lookups > 0 else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_bytes": self._diskBytes()}
+
+    def key(self, shape):
+        """Gives the cache key of a shape. Place the shape at identity first
+        if the key should not depend on its placement."""
+        with ARProfiler.timed("ShapeCache.key"):
+            return brepKey(geometryBrep(shape))
+
+    def lookup(self, shape, compute, key=None):
+        """Gives the cached value for shape, calling compute(shape) and
+        storing the result on a miss. A key derived from self.key(shape)
+        caches another value of the same shape."""
+        if key is None:
+            key = self.key(shape)
+        value = self.get(key)
+        if value is None:
+            value = compute(shape)
+            self.put(key, value)
+        return value
+
+    def get(self, key):
+        if key in self.memory:
+            value = self.memory.pop(key)
+            self.memory[key] = value
+            self.memory_hits += 1
+            ARProfiler.count("ShapeCache memory hits")
+            return value
+        value = self._diskGet(key)
+        if value is not None:
+            self._memoryPut(key, value)
+            self.disk_hits += 1
+            ARProfiler.count("ShapeCache disk hits")
+            return value
+        self.misses += 1
+        ARProfiler.count("ShapeCache misses")
+        return None
+
+    def put(self, key, value):
+        self._memoryPut(key, value)
+        self._diskPut(key, value)
+
+    def clear(self):
+        """Empties both tiers."""
+        self.memory.clear()
+        if self.cachedir is not None and os.path.isdir(self.cachedir):
+            for f in os.listdir(self.cachedir):
+                if f.endswith(".json"):
+                    os.remove(os.path.join(self.cachedir, f))
+        self.disk_bytes = 0
+
+    def _memoryPut(self, key, value):
+        self.memory.pop(key, None)
+        self.memory[key] = value
+        while len(self.memory) > self.memsize:
+            self.memory.popitem(last=False)
+
+    def _diskPath(self, key):
+        return os.path.join(self.cachedir, key + ".json")
+
+    def _diskGet(self, key):
+        if self.cachedir is None:
+            return None
+        path = self._diskPath(key)
+        try:
+            with open(path, "r") as cachefile:
+                value = json.load(cachefile)
+            # Refresh mtime, eviction removes the least recently used first
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return value
+
+    def _diskPut(self, key, value):
+        if self.cachedir is None:
+            return
+        if not os.path.exists(self.cachedir):
+            try:
+                os.makedirs(self.cachedir)
+            except OSError:
+                return
+        path = self._diskPath(key)
+        disk_bytes = self._diskBytes()
+        try:
+            # An entry being replaced no longer counts
+            disk_bytes -= os.path.getsize(path)
+        except OSError:
+            pass
+        tmppath = None
+        try:
+            fd, tmppath = tempfile.mkstemp(dir=self.cachedir, suffix=".tmp")
+            with os.fdopen(fd, "w") as cachefile:
+                json.dump(value, cachefile)
+            os.rename(tmppath, path)
+        except (IOError, OSError):
+            # Another process stored the same entry first, or the cache
+            # directory is read-only or full. The entry stays in memory.
+            if tmppath is not None and os.path.exists(tmppath):
+                try:
+                    os.remove(tmppath)
+                except OSError:
+                    pass
+            return
+        self.disk_bytes = disk_bytes + os.path.getsize(path)
+        if self.disk_bytes > self.disksize:
+            self._evict()
+
+    def _diskBytes(self):
+        if self.disk_bytes is None:
+            self.disk_bytes = 0
+            if self.cachedir is not None and os.path.isdir(self.cachedir):
+                for f in os.listdir(self.cachedir):
+                    if f.endswith(".json"):
+                        path = os.path.join(self.cachedir, f)
+                        self.disk_bytes += os.path.getsize(path)
+        return self.disk_bytes
+
+    def _evict(self):
+        """Removes the least recently used files until the disk tier is
+        below 80% of its size."""
+        entries = []
+        for f in os.listdir(self.cachedir):
+            if f.endswith(".json"):
+                path = os.path.join(self.cachedir, f)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in entries:
+            if total <= 0.8*self.disksize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self.disk_bytes = total
+
+
+###################################################################
+# Module functions
+###################################################################
+_shape_cache = None
+
+
+def geometryBrep(shape):
+    """Gives the BRep string of a shape without its triangulation. The
+    BRep format also stores any triangulation of the shape, which changes
+    when the shape is meshed for display or tessellated, so keys are made
+    from a copy with the triangulation removed."""
+    geometry = shape.copy()
+    geometry.clean()
+    return geometry.exportBrepToString()
+
+
+def brepKey(brep):
+    """Gives the cache key of a shape from its BRep string (see
+    geometryBrep and ShapeCache.key)."""
+    h = hashlib.sha1(CACHE_VERSION.encode("ascii"))
+    if not isinstance(brep, bytes):
+        brep = brep.encode("utf-8")
+    h.update(brep)
+    return h.hexdigest()
+
+
+def getShapeCache():
+    """Gives the shared shape cache, stored under the FreeCAD user data
+    directory."""
+    global _shape_cache
+    if _shape_cache is None:
+        cachedir = os.path.join(FreeCAD.getUserAppDataDir(),
+                                __workbenchname__, "cache")
+        _shape_cache = ShapeCache(cachedir)
+    return _shape_cache
+
+
+def setShapeCache(cache):
+    """Replaces the shared shape cache, e.g. with one in a temporary
+    directory. Returns the previous one, None if it was never created."""
+    global _shape_cache
+    previous = _shape_cache
+    _shape_cache = cache
+    return previous
+
+
+def getCacheStats():
+    """Gives the hit/miss counters of the shared shape cache."""
+    return getShapeCache().stats()
+
+
+def clearCache():
+    """Empties the shared shape cache."""
+    getShapeCache().clear()
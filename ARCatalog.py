@@ -0,0 +1,245 @@
+import FreeCAD
+import Part
+import ARTools
+import ARBatch
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+
+__title__ = "ARCatalog"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Feature catalog for the Annotations for Robotics workbench. Stores the
+primitive info (see ARTools.getPrimitiveInfo) of every face and edge of every
+part in many STEP files in an SQLite database, so features can be queried
+without opening the CAD files again. Example:
+catalog = ARCatalog.FeatureCatalog("~/features.db")
+catalog.update("~/vendor/*.step")
+holes = catalog.query("Cylinder", radius=(2.9e-3, 3.1e-3))
+"""
+
+# Primitive types getPrimitiveInfo has complete information about
+CATALOG_PRIMITIVES = ["ArcOfCircle", "ArcOfEllipse", "ArcOfHyperbola",
+                      "ArcOfParabola", "Circle", "Ellipse", "Hyperbola",
+                      "Parabola", "Line", "Cylinder", "Plane", "Sphere",
+                      "Toroid", "Cone"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS features (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    part TEXT NOT NULL,
+    element TEXT NOT NULL,
+    primitivetype TEXT NOT NULL,
+    shapetype TEXT NOT NULL,
+    radius REAL,
+    majorradius REAL,
+    minorradius REAL,
+    cx REAL, cy REAL, cz REAL,
+    ax REAL, ay REAL, az REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS features_radius
+    ON features (primitivetype, radius);
+CREATE INDEX IF NOT EXISTS features_radii
+    ON features (primitivetype, majorradius, minorradius);
+CREATE INDEX IF NOT EXISTS features_file ON features (file_id);
+"""
+
+FEATURE_COLUMNS = ["part", "element", "primitivetype", "shapetype",
+                   "radius", "majorradius", "minorradius",
+                   "cx", "cy", "cz", "ax", "ay", "az", "data"]
+
+
+###################################################################
+# Module functions
+###################################################################
+def getFeatureRows(part):
+    """Gives one catalog row per face and edge of the part, with the
+    primitive info computed in the part's own frame."""
+    shape = ARTools.getLocalShape(part)
+    indices, counts = ARTools.shapeCensus(shape)
+    rows = []
+    for shape_type, elements in (("Face", shape.Faces),
+                                 ("Edge", shape.Edges)):
+        for prim_type, idx in indices[shape_type].items():
+            if prim_type not in CATALOG_PRIMITIVES:
+                continue
+            for i in idx:
+                info = ARTools.getPrimitiveInfo(prim_type, elements[i - 1])
+                center = info.get("center", info.get("position",
+                                                     [None, None, None]))
+                axis = info.get("axis", [None, None, None])
+                rows.append((str(part.Label),
+                             shape_type + str(i),
+                             prim_type,
+                             shape_type,
+                             info.get("radius"),
+                             info.get("majorradius"),
+                             info.get("minorradius"))
+                            + tuple(center) + tuple(axis)
+                            + (json.dumps(info),))
+    return rows
+
+
+def catalogStepFile(ifile):
+    """Gives the catalog rows of every part in a STEP file.
+    Returns (ifile, rows, error)."""
+    doc = None
+    rows = []
+    try:
+        doc = ARBatch.openStepFile(ifile)
+        for obj in doc.Objects:
+            if isinstance(obj, Part.Feature) and not obj.Shape.isNull():
+                rows.extend(getFeatureRows(obj))
+    except Exception as e:
+        return ifile, [], str(e)
+    finally:
+        if doc is not None:
+            FreeCAD.closeDocument(doc.Name)
+    return ifile, rows, None
+
+
+###################################################################
+# Catalog
+###################################################################
+class FeatureCatalog(object):
+    """SQLite backed catalog of the features in many STEP files.
+    Lengths are in m, like the exported part info."""
+    def __init__(self, dbfile):
+        self.dbfile = os.path.abspath(os.path.expanduser(dbfile))
+        dbdir = os.path.dirname(self.dbfile)
+        if not os.path.exists(dbdir):
+            os.makedirs(dbdir)
+        self.db = sqlite3.connect(self.dbfile)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def staleFiles(self, files):
+        """Gives the files that are not in the catalog or have changed since
+        they were added."""
+        stale = []
+        for f in files:
+            st = os.stat(f)
+            row = self.db.execute("SELECT mtime, size FROM files WHERE path=?",
+                                  (f,)).fetchone()
+            if row is None or row[0] != st.st_mtime or row[1] != st.st_size:
+                stale.append(f)
+        return stale
+
+    def update(self, inputs, processes=None):
+        """Adds the STEP files found in inputs (directory, glob pattern or
+        list of those, see ARBatch.findStepFiles) to the catalog. Files that
+        have not changed since the last update are skipped. The files are
+        read in a process pool. Returns a dictionary of statistics."""
+        files = ARBatch.findStepFiles(inputs)
+        stale = self.staleFiles(files)
+        t0 = time.time()
+        failed = []
+        nfeatures = 0
+        if len(stale) > 0:
+            if processes is None:
+                processes = multiprocessing.cpu_count()
+            processes = max(1, min(processes, len(stale)))
+            if processes == 1:
+                results = map(catalogStepFile, stale)
+            else:
+                pool = multiprocessing.Pool(processes)
+                results = pool.imap_unordered(catalogStepFile, stale)
+            try:
+                for ifile, rows, err in results:
+                    if err is not None:
+                        failed.append(ifile)
+                        FreeCAD.Console.PrintError("Failed to catalog "
+                                                   + ifile + ": " + err
+                                                   + "\n")
+                        continue
+                    self._replaceFile(ifile, rows)
+                    nfeatures += len(rows)
+            finally:
+                if processes > 1:
+                    pool.close()
+                    pool.join()
+        elapsed = time.time() - t0
+        FreeCAD.Console.PrintMessage(
+            "Cataloged {0} features from {1} files in {2:.2f} s, "
+            "{3} files unchanged\n".format(nfeatures,
+                                            len(stale) - len(failed),
+                                            elapsed,
+                                            len(files) - len(stale)))
+        return {"files": len(files),
+                "updated": len(stale) - len(failed),
+                "skipped": len(files) - len(stale),
+                "failed": failed,
+                "features": nfeatures,
+                "seconds": elapsed}
+
+    def _replaceFile(self, ifile, rows):
+        st = os.stat(ifile)
+        with self.db:
+            self.db.execute("DELETE FROM files WHERE path=?", (ifile,))
+            cur = self.db.execute(
+                "INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                (ifile, st.st_mtime, st.st_size))
+            file_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO features (file_id, " + ", ".join(FEATURE_COLUMNS)
+                + ") VALUES (?" + ", ?"*len(FEATURE_COLUMNS) + ")",
+                [(file_id,) + row for row in rows])
+
+    def query(self, primitivetype=None, radius=None, majorradius=None,
+              minorradius=None, part=None, path=None):
+        """Gives the features matching all the given criteria as a list of
+        dictionaries with the file path, part label, subelement name, types
+        and primitive info. radius, majorradius and minorradius are
+        (min, max) ranges in m, e.g. radius=(2.9e-3, 3.1e-3)."""
+        where = []
+        args = []
+        if primitivetype is not None:
+            where.append("f.primitivetype = ?")
+            args.append(primitivetype)
+        for column, value in (("radius", radius),
+                              ("majorradius", majorradius),
+                              ("minorradius", minorradius)):
+            if value is not None:
+                where.append("f." + column + " BETWEEN ? AND ?")
+                args.extend(value)
+        if part is not None:
+            where.append("f.part = ?")
+            args.append(part)
+        if path is not None:
+            where.append("files.path = ?")
+            args.append(os.path.abspath(os.path.expanduser(path)))
+        sql = ("SELECT files.path, f.part, f.element, f.primitivetype, "
+               "f.shapetype, f.data FROM features f "
+               "JOIN files ON files.id = f.file_id")
+        if len(where) > 0:
+            sql = sql + " WHERE " + " AND ".join(where)
+        results = []
+        for row in self.db.execute(sql, args):
+            results.append({"path": row[0],
+                            "part": row[1],
+                            "element": row[2],
+                            "primitivetype": row[3],
+                            "shapetype": row[4],
+                            "info": json.loads(row[5])})
+        return results
+
+    def counts(self):
+        """Gives the number of features per primitive type."""
+        sql = ("SELECT primitivetype, COUNT(*) FROM features "
+               "GROUP BY primitivetype")
+        return dict(self.db.execute(sql).fetchall())
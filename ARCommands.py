@@ -0,0 +1,104 @@
+import FreeCAD
+import FreeCADGui
+import importlib
+import os
+import sys
+import time
+
+__title__ = "ARCommands"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Commands of the Annotations for Robotics workbench. The commands are
+registered from the metadata below, and the modules implementing them
+(with pivy, PySide, Part, ...) are only imported when a command is first
+activated."""
+
+uidir = os.path.join(FreeCAD.getUserAppDataDir(),
+                     "Mod", __workbenchname__, "UI")
+icondir = os.path.join(uidir, "icons")
+
+# name: (module, function, icon, menu text, tool tip)
+COMMANDS = {
+    "FrameCommand":
+    ("ARFrames", "makeFrame", "frame.svg",
+     "Make a free frame",
+     "Make a freestanding reference frame."),
+    "AllPartFramesCommand":
+    ("ARFrames", "makeAllPartFrames", "allpartframes.svg",
+     "All part frames",
+     "Make all part frames."),
+    "AllFeatureFramesCommand":
+    ("ARFrames", "makeAllFeatureFrames", "PointOnCenterline.svg",
+     "All feature frames",
+     "Make feature frames on all holes and round features of the selected parts."),
+    "FeatureFrameCommand":
+    ("ARFrames", "spawnFeatureFrameCreator", "featureframecreator.svg",
+     "Feature frame creator",
+     "Create a feature frame on selected primitive."),
+    "ExportPartInfoAndFeaturesDialogueCommand":
+    ("ARTools", "exportPartInfoAndFeaturesDialogue", "parttojson.svg",
+     "Export info and featureframes",
+     "Export part properties (placement, C.O.M) and feature frames"),
+    "RebindFeatureFramesDialogueCommand":
+    ("ARRebind", "rebindFeatureFramesDialogue", "featureframecreator.svg",
+     "Re-bind feature frames",
+     "Recreate the feature frames of a features json file on a new revision of the part"),
+    "ExportAssemblyDialogueCommand":
+    ("ARTools", "exportAssemblyDialogue", "allpartgroups.svg",
+     "Export assembly",
+     "Export part properties and feature frames of all selected parts, or the whole document"),
+    "ExportMeshesDialogueCommand":
+    ("ARMesh", "exportMeshesDialogue", "parttojson.svg",
+     "Export meshes",
+     "Export meshes of all selected parts, or the whole document, in the part frames"),
+}
+FRAME_COMMANDS = ["FrameCommand",
+                  "AllPartFramesCommand",
+                  "AllFeatureFramesCommand",
+                  "FeatureFrameCommand",
+                  "RebindFeatureFramesDialogueCommand"]
+TOOL_COMMANDS = ["ExportPartInfoAndFeaturesDialogueCommand",
+                 "ExportAssemblyDialogueCommand",
+                 "ExportMeshesDialogueCommand"]
+
+# Time in seconds spent on workbench startup steps, see reportTiming
+timings = {}
+
+
+def reportTiming(step, seconds):
+    """Records and logs the time spent on a startup step."""
+    timings[step] = seconds
+    FreeCAD.Console.PrintLog("ARBench: {0} took {1:.1f} ms\n".format(
+        step, 1e3*seconds))
+
+
+class LazyCommand(object):
+    """Command that imports its module on first activation."""
+    def __init__(self, module, function, resources):
+        self.module = module
+        self.function = function
+        self.resources = resources
+
+    def Activated(self):
+        if self.module not in sys.modules:
+            t0 = time.time()
+            mod = importlib.import_module(self.module)
+            reportTiming("import " + self.module, time.time() - t0)
+        else:
+            mod = sys.modules[self.module]
+        getattr(mod, self.function)()
+
+    def GetResources(self):
+        return self.resources
+
+
+def addCommands():
+    """Registers all the commands of the workbench."""
+    for name, (module, function, icon, menutext, tooltip) in COMMANDS.items():
+        resources = {"Pixmap": str(os.path.join(icondir, icon)),
+                     "MenuText": menutext,
+                     "ToolTip": tooltip}
+        FreeCADGui.addCommand(name, LazyCommand(module, function, resources))
@@ -1,11 +1,14 @@
 import FreeCAD
 import ARTools
+import ARProfiler
+import Part
+import contextlib
+import os
+import weakref
 if FreeCAD.GuiUp:
     import FreeCADGui
     from pivy import coin
     from PySide import QtCore, QtGui, QtSvg
-    import Part
-    import os
 
 __title__ = "ARFrames"
 __author__ = "Mathias Hauan Arbo"
@@ -35,16 +38,30 @@ class Frame(object):
     def execute(self, obj):
         pass
 
+    def onDocumentRestored(self, obj):
+        self.obj = obj
+
     def __getstate__(self):
-        return None
+        # Stored with the document, so exports after reopening it need not
+        # query the geometry again
+        return self.additional_data
 
     def __setstate__(self, state):
+        # Documents saved before additional_data was stored give None
+        self.additional_data = state or {}
         return None
 
-    def getDict(self):
+    def getDict(self, axisvecs=None):
+        """axisvecs are already converted placements by key, see
+        ARTools.getFrameDicts."""
+        if axisvecs is None:
+            axisvecs = {}
         d = {}
         d["label"] = str(self.obj.Label)
-        d["placement"] = ARTools.placement2axisvec(self.obj.Placement)
+        if "placement" in axisvecs:
+            d["placement"] = axisvecs["placement"]
+        else:
+            d["placement"] = ARTools.placement2axisvec(self.obj.Placement)
         d.update(self.additional_data)
         return d
 
@@ -66,8 +83,8 @@ class PartFrame(Frame):
         if FreeCAD.GuiUp:
             obj.ViewObject.Proxy.updateData(obj, "Placement")
 
-    def getDict(self):
-        d = Frame.getDict(self)
+    def getDict(self, axisvecs=None):
+        d = Frame.getDict(self, axisvecs)
         d["part"] = str(self.obj.Part.Label)
         return d
 
@@ -91,11 +108,58 @@ class FeatureFrame(PartFrame):
         obj.addProperty("App::PropertyString",
                         "Positioning", "Feature",
                         "The type of positioning used during creation.")
+        self.addSubElementProperty(obj)
         obj.FeaturePlacement = featurePlacement
+        # Whether additional_data holds the primitive info, which may be
+        # empty, e.g. for BSplines
+        self.has_additional_data = False
 
-    def getDict(self):
-        d = PartFrame.getDict(self)
-        d["featureplacement"] = ARTools.placement2axisvec(self.obj.FeaturePlacement)
+    def addSubElementProperty(self, obj):
+        obj.addProperty("App::PropertyString",
+                        "SubElement", "Feature",
+                        "The subelement of the part the feature is on, e.g. Face3.")
+        obj.setEditorMode("SubElement", 1)
+
+    def onDocumentRestored(self, obj):
+        PartFrame.onDocumentRestored(self, obj)
+        if not hasattr(obj, "SubElement"):
+            self.addSubElementProperty(obj)
+
+    def __setstate__(self, state):
+        PartFrame.__setstate__(self, state)
+        self.has_additional_data = state is not None
+        return None
+
+    def setAdditionalData(self, additional_data):
+        """Sets the primitive info of the feature."""
+        self.additional_data.update(additional_data)
+        self.has_additional_data = True
+
+    def getAdditionalData(self):
+        """Gives the primitive info of the feature. Frames from documents
+        saved without it get it recomputed from their SubElement, once."""
+        if (not self.has_additional_data
+                and self.obj.ShapeType not in ("", "Vertex")
+                and getattr(self.obj, "SubElement", "") != ""):
+            self.has_additional_data = True
+            try:
+                subobj = self.obj.Part.Shape.getElement(self.obj.SubElement)
+                self.additional_data = ARTools.getPrimitiveInfo(
+                    self.obj.PrimitiveType, subobj)
+            except Exception as e:
+                FreeCAD.Console.PrintWarning(
+                    "No primitive info for " + str(self.obj.Label) + ": "
+                    + str(e) + "\n")
+        return self.additional_data
+
+    def getDict(self, axisvecs=None):
+        self.getAdditionalData()
+        d = PartFrame.getDict(self, axisvecs)
+        if axisvecs is not None and "featureplacement" in axisvecs:
+            d["featureplacement"] = axisvecs["featureplacement"]
+        else:
+            d["featureplacement"] = ARTools.placement2axisvec(self.obj.FeaturePlacement)
+        d["primitivetype"] = str(self.obj.PrimitiveType)
         d["shapetype"] = str(self.obj.ShapeType)
         d["positioning"] = str(self.obj.Positioning)
         return d
@@ -104,65 +168,249 @@ class FeatureFrame(PartFrame):
 ############################################################
 # ViewProvider to the frames
 ############################################################
+# Style of the shared axis cross. Frames with another HeadSize or LineWidth
+# get an axis cross of their own.
+FRAME_STYLE = {"Scale": 0.12, "HeadSize": 3.0, "LineWidth": 2.0}
+_shared_axis_cross = None
+
+
+def styleAxisCross(ax, headsize, linewidth):
+    """Sets the cone size and line width of an SoAxisCrossKit."""
+    lwstring = "lineWidth {0}".format(linewidth)
+    for axis in ("x", "y", "z"):
+        cone = ax.getPart(axis + "Head.shape", 0)
+        cone.bottomRadius.setValue(float(headsize))
+        ax.set(axis + "Axis.appearance.drawStyle", lwstring)
+        ax.set(axis + "Axis.pickStyle", "style SHAPE")
+
+
+def makeAxisCross(headsize, linewidth):
+    # Takes heavily from SoAxisCrosskit.h,
+    # and Toggle_DH_Frames by galou_breizh on the forums
+    ax = coin.SoType.fromName("SoAxisCrossKit").createInstance()
+    styleAxisCross(ax, headsize, linewidth)
+    return ax
+
+
+def getAxisCross(headsize, linewidth):
+    """Gives the shared axis cross if the style is the shared one, else a
+    new axis cross."""
+    global _shared_axis_cross
+    if (headsize != FRAME_STYLE["HeadSize"]
+            or linewidth != FRAME_STYLE["LineWidth"]):
+        return makeAxisCross(headsize, linewidth)
+    if _shared_axis_cross is None:
+        _shared_axis_cross = makeAxisCross(headsize, linewidth)
+        # Keep it alive when no frame uses it
+        _shared_axis_cross.ref()
+    return _shared_axis_cross
+
+
+def setFrameStyle(scale=None, headsize=None, linewidth=None):
+    """Changes the shared frame style. Frames that use the shared style
+    follow the change, frames that override it are left alone."""
+    old_style = dict(FRAME_STYLE)
+    for key, value in (("Scale", scale),
+                       ("HeadSize", headsize),
+                       ("LineWidth", linewidth)):
+        if value is not None:
+            FRAME_STYLE[key] = float(value)
+    if _shared_axis_cross is not None:
+        styleAxisCross(_shared_axis_cross, FRAME_STYLE["HeadSize"],
+                       FRAME_STYLE["LineWidth"])
+    for doc in FreeCAD.listDocuments().values():
+        for obj in doc.Objects:
+            if not isinstance(getattr(obj, "Proxy", None), Frame):
+                continue
+            vobj = obj.ViewObject
+            for key in ("Scale", "HeadSize", "LineWidth"):
+                if (getattr(vobj, key) == old_style[key]
+                        and old_style[key] != FRAME_STYLE[key]):
+                    setattr(vobj, key, FRAME_STYLE[key])
+
+
+# Level of detail of frames. Frames further than Distance (mm) from the
+# camera are drawn as points, and only the MaxFullFrames frames closest to
+# the camera are drawn as axis crosses.
+LOD_STYLE = {"Enabled": True, "Distance": 5000.0, "MaxFullFrames": 500,
+             "PointSize": 4.0}
+_frame_marker = None
+
+
+def getFrameMarker():
+    """Gives the shared point drawn in place of far away frames."""
+    global _frame_marker
+    if _frame_marker is None:
+        _frame_marker = coin.SoSeparator()
+        drawstyle = coin.SoDrawStyle()
+        drawstyle.pointSize.setValue(LOD_STYLE["PointSize"])
+        coords = coin.SoCoordinate3()
+        coords.point.setValue(0, 0, 0)
+        _frame_marker.addChild(drawstyle)
+        _frame_marker.addChild(coords)
+        _frame_marker.addChild(coin.SoPointSet())
+        _frame_marker.ref()
+    return _frame_marker
+
+
+class FrameLOD(object):
+    """Keeps track of the displayed frames and caps the number of frames
+    drawn as axis crosses to the ones closest to the camera. The camera is
+    polled while there are more frames than the cap."""
+    def __init__(self):
+        self.vps = weakref.WeakSet()
+        self.timer = None
+        self.campos = None
+
+    def register(self, vp):
+        self.vps.add(vp)
+        if len(self.vps) > LOD_STYLE["MaxFullFrames"]:
+            self.start()
+
+    def start(self):
+        if self.timer is None:
+            self.timer = QtCore.QTimer()
+            self.timer.setInterval(250)
+            self.timer.timeout.connect(self.refresh)
+        self.campos = None
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def refresh(self):
+        import numpy as np
+        vps = [vp for vp in self.vps if hasattr(vp, "lodswitch")]
+        capped = LOD_STYLE["Enabled"] and len(vps) > LOD_STYLE["MaxFullFrames"]
+        if not capped:
+            for vp in vps:
+                vp.setCapped(False)
+            if self.timer is not None:
+                self.timer.stop()
+            return
+        gdoc = FreeCADGui.ActiveDocument
+        view = getattr(gdoc, "ActiveView", None) if gdoc else None
+        if view is None or not hasattr(view, "getCameraNode"):
+            return
+        campos = tuple(view.getCameraNode().position.getValue())
+        if campos == self.campos:
+            return
+        self.campos = campos
+        positions = np.array([vp.world_position for vp in vps])
+        dist = np.linalg.norm(positions - np.array(campos), axis=1)
+        full = np.zeros(len(vps), dtype=bool)
+        full[np.argpartition(dist, LOD_STYLE["MaxFullFrames"])
+             [:LOD_STYLE["MaxFullFrames"]]] = True
+        for vp, f in zip(vps, full.tolist()):
+            vp.setCapped(not f)
+
+
+_frame_lod = None
+
+
+def getFrameLOD():
+    global _frame_lod
+    if _frame_lod is None:
+        _frame_lod = FrameLOD()
+    return _frame_lod
+
+
+def setFrameLOD(enabled=None, distance=None, max_full=None):
+    """Changes the level of detail settings of all frames, see LOD_STYLE."""
+    for key, value in (("Enabled", enabled),
+                       ("Distance", distance),
+                       ("MaxFullFrames", max_full)):
+        if value is not None:
+            LOD_STYLE[key] = value
+    lod = getFrameLOD()
+    for vp in list(lod.vps):
+        if hasattr(vp, "lod"):
+            vp.setLODRange()
+    lod.start()
+    lod.refresh()
+
+
 class ViewProviderFrame(object):
     """ViewProvider for the basic frame.
     Uses the SOAxiscrosskit to create axises with constant length regardless
-    of zoom. Updates position when placement is changed.
+    of zoom. Updates position when placement is changed. All frames with the
+    default style share the same axis cross, see FRAME_STYLE.
     """
     def __init__(self, vobj):
         vobj.addProperty("App::PropertyFloat", "Scale")
-        vobj.Scale = 0.12
+        vobj.Scale = FRAME_STYLE["Scale"]
         vobj.addProperty("App::PropertyFloat", "HeadSize")
-        vobj.HeadSize = 3.0
+        vobj.HeadSize = FRAME_STYLE["HeadSize"]
         vobj.addProperty("App::PropertyFloat", "LineWidth")
-        vobj.LineWidth = 2.0
+        vobj.LineWidth = FRAME_STYLE["LineWidth"]
         vobj.Proxy = self
 
     def attach(self, vobj):
+        with ARProfiler.timed("ViewProviderFrame.attach"):
+            self._attach(vobj)
+
+    def _attach(self, vobj):
         # We only have a shaded visual group
         self.shaded = coin.SoGroup()
 
-        # Takes heavily from SoAxisCrosskit.h,
-        # and Toggle_DH_Frames by galou_breizh on the forums
+        # Only the scaling is per frame, the axis cross is shared
         self.vframe = coin.SoType.fromName("SoShapeScale").createInstance()
-        self.vframe.setPart("shape", coin.SoType.fromName("SoAxisCrossKit").createInstance())
-        self.vframe.scaleFactor.setValue(0.1)
-        ax = self.vframe.getPart("shape", 0)
-        cone = ax.getPart("xHead.shape", 0)
-        cone.bottomRadius.setValue(vobj.HeadSize)
-        cone = ax.getPart("yHead.shape", 0)
-        cone.bottomRadius.setValue(vobj.HeadSize)
-        cone = ax.getPart("zHead.shape", 0)
-        cone.bottomRadius.setValue(vobj.HeadSize)
-        lwstring = "lineWidth {0}".format(vobj.LineWidth)
-        ax.set("xAxis.appearance.drawStyle", lwstring)
-        ax.set("yAxis.appearance.drawStyle", lwstring)
-        ax.set("zAxis.appearance.drawStyle", lwstring)
-        ax.set("xAxis.pickStyle", "style SHAPE")
-        ax.set("yAxis.pickStyle", "style SHAPE")
-        ax.set("zAxis.pickStyle", "style SHAPE")
+        self.vframe.setPart("shape", getAxisCross(vobj.HeadSize,
+                                                  vobj.LineWidth))
+        self.vframe.scaleFactor.setValue(float(vobj.Scale))
+
+        # Far away frames are points, and so are frames over the cap of
+        # fully drawn frames (see FrameLOD)
+        self.lod = coin.SoLOD()
+        self.lod.addChild(self.vframe)
+        self.lod.addChild(getFrameMarker())
+        self.setLODRange()
+        self.lodswitch = coin.SoSwitch()
+        self.lodswitch.addChild(self.lod)
+        self.lodswitch.addChild(getFrameMarker())
+        self.lodswitch.whichChild.setValue(0)
 
         # Then remember to make it selectable in the viewer
         selectionNode = coin.SoType.fromName("SoFCSelection").createInstance()
         selectionNode.documentName.setValue(FreeCAD.ActiveDocument.Name)
         selectionNode.objectName.setValue(vobj.Object.Name)
         selectionNode.subElementName.setValue("Frame")
-        selectionNode.addChild(self.vframe)
+        selectionNode.addChild(self.lodswitch)
 
-        # We would like to place it where we want
+        # We would like to place it where we want, and skip it when it is
+        # outside the view
         self.transform = coin.SoTransform()
+        culled = coin.SoSeparator()
+        culled.renderCulling.setValue(coin.SoSeparator.ON)
+        culled.addChild(selectionNode)
         self.shaded.addChild(self.transform)
-        self.shaded.addChild(self.vframe)
-        self.shaded.addChild(selectionNode)
+        self.shaded.addChild(culled)
         vobj.addDisplayMode(self.shaded, "Shaded")
+        self.world_position = (0.0, 0.0, 0.0)
+        getFrameLOD().register(self)
+
+    def setLODRange(self):
+        if LOD_STYLE["Enabled"]:
+            self.lod.range.setValue(LOD_STYLE["Distance"])
+        else:
+            self.lod.range.setNum(0)
+
+    def setCapped(self, capped):
+        """Draws the frame as a point if capped."""
+        which = 1 if capped else 0
+        if self.lodswitch.whichChild.getValue() != which:
+            self.lodswitch.whichChild.setValue(which)
+
+    def setPlacement(self, pl):
+        """Places the frame at the global placement pl."""
+        self.transform.translation = (pl.Base.x,
+                                      pl.Base.y,
+                                      pl.Base.z)
+        self.transform.rotation = pl.Rotation.Q
+        self.world_position = (pl.Base.x, pl.Base.y, pl.Base.z)
 
     def updateData(self, fp, prop):
         if prop == "Placement":
             pl = fp.getPropertyByName("Placement")
-            self.transform.translation = (pl.Base.x,
-                                          pl.Base.y,
-                                          pl.Base.z)
-            self.transform.rotation = pl.Rotation.Q
+            self.setPlacement(pl)
 
     def getDisplayModes(self, vobj):
         modes = ["Shaded"]
@@ -180,21 +428,11 @@ class ViewProviderFrame(object):
         if prop == "Scale":
             s = vp.getPropertyByName("Scale")
             self.vframe.scaleFactor.setValue(float(s))
-        elif prop == "HeadSize":
+        elif prop in ("HeadSize", "LineWidth"):
+            # Switches between the shared and an own axis cross
             hs = vp.getPropertyByName("HeadSize")
-            xcone = self.vframe.getPart("shape", 0).getPart("xHead.shape", 0)
-            xcone.bottomRadius.setValue(float(hs))
-            ycone = self.vframe.getPart("shape", 0).getPart("yHead.shape", 0)
-            ycone.bottomRadius.setValue(float(hs))
-            zcone = self.vframe.getPart("shape", 0).getPart("zHead.shape", 0)
-            zcone.bottomRadius.setValue(float(hs))
-        elif prop == "LineWidth":
             lw = vp.getPropertyByName("LineWidth")
-            lwstring = "lineWidth {0}".format(lw)
-            ax = self.vframe.getPart("shape", 0)
-            ax.set("xAxis.appearance.drawStyle", lwstring)
-            ax.set("yAxis.appearance.drawStyle", lwstring)
-            ax.set("zAxis.appearance.drawStyle", lwstring)
+            self.vframe.setPart("shape", getAxisCross(hs, lw))
 
     def __getstate__(self):
         return None
@@ -203,75 +441,446 @@ class ViewProviderFrame(object):
         pass
 
 
+class PartPlacementObserver(object):
+    """Document observer that moves the frames attached to a part when the
+    part's placement changes. Changes are collected and applied once per
+    event loop iteration, so dragging a part does not update its frames
+    for every intermediate placement more than once per redraw."""
+    def __init__(self):
+        self.frames = {}
+        self.pending = set()
+        self.scheduled = False
+
+    def register(self, part, vp):
+        """Makes vp follow the placement of part."""
+        key = (part.Document.Name, part.Name)
+        if key not in self.frames:
+            self.frames[key] = weakref.WeakSet()
+        self.frames[key].add(vp)
+
+    def slotChangedObject(self, obj, prop):
+        if prop != "Placement":
+            return
+        try:
+            key = (obj.Document.Name, obj.Name)
+        except Exception:
+            # Object being deleted
+            return
+        if key not in self.frames:
+            return
+        self.pending.add(key)
+        if not self.scheduled:
+            self.scheduled = True
+            QtCore.QTimer.singleShot(0, self.flush)
+
+    def slotDeletedDocument(self, doc):
+        for key in list(self.frames.keys()):
+            if key[0] == doc.Name:
+                del self.frames[key]
+
+    def flush(self):
+        self.scheduled = False
+        pending = self.pending
+        self.pending = set()
+        docs = FreeCAD.listDocuments()
+        for docname, partname in pending:
+            part = None
+            if docname in docs:
+                part = docs[docname].getObject(partname)
+            if part is None:
+                self.frames.pop((docname, partname), None)
+                continue
+            parentpl = part.Placement
+            for vp in list(self.frames[(docname, partname)]):
+                vp.setParentPlacement(parentpl)
+
+
+_part_observer = None
+
+
+def getPartObserver():
+    global _part_observer
+    if _part_observer is None:
+        _part_observer = PartPlacementObserver()
+        FreeCAD.addDocumentObserver(_part_observer)
+    return _part_observer
+
+
 class ViewProviderPartFrame(ViewProviderFrame):
-    """View provider to the part frame."""
+    """View provider to the part frame.
+    The placement relative to the part is cached, and the frame follows the
+    part through the PartPlacementObserver."""
     def updateData(self, fp, prop):
         if prop == "Placement":
-            parentpl = fp.getPropertyByName("Part").Placement
-            localpl = fp.Placement
-            pl = parentpl.multiply(localpl)
-            self.transform.translation = (pl.Base.x,
-                                          pl.Base.y,
-                                          pl.Base.z)
-            self.transform.rotation = pl.Rotation.Q
+            part = fp.getPropertyByName("Part")
+            if part is None:
+                # Still restoring
+                return
+            self.localpl = self.getLocalPlacement(fp)
+            getPartObserver().register(part, self)
+            self.setParentPlacement(part.Placement)
+
+    def getLocalPlacement(self, fp):
+        return fp.Placement
+
+    def setParentPlacement(self, parentpl):
+        """Places the frame relative to the part placement parentpl."""
+        if hasattr(self, "localpl"):
+            self.setPlacement(parentpl.multiply(self.localpl))
 
 
-class ViewProviderFeatureFrame(ViewProviderFrame):
+class ViewProviderFeatureFrame(ViewProviderPartFrame):
     """View provider to the feature frames."""
     def updateData(self, fp, prop):
-        if prop == "Placement":
-            parentpl = fp.getPropertyByName("Part").Placement
-            featurepl = fp.getPropertyByName("FeaturePlacement")
-            localpl = fp.Placement
-            pl = parentpl.multiply(featurepl.multiply(localpl))
-            self.transform.translation = (pl.Base.x,
-                                          pl.Base.y,
-                                          pl.Base.z)
-            self.transform.rotation = pl.Rotation.Q
+        if prop == "FeaturePlacement":
+            prop = "Placement"
+        ViewProviderPartFrame.updateData(self, fp, prop)
+
+    def getLocalPlacement(self, fp):
+        featurepl = fp.getPropertyByName("FeaturePlacement")
+        return featurepl.multiply(fp.Placement)
 
 
 ###################################################################
 # Base functions
 ###################################################################
 
+def addToPartGroup(part, objs):
+    """Adds the objects to the geo feature group (assembly) of the part, if
+    the part is in one. Only available for FreeCAD >0.16."""
+    if int(FreeCAD.Version()[1]) > 16:
+        geo_feature_group = part.getParentGeoFeatureGroup()
+        if geo_feature_group is not None:
+            geo_feature_group.addObjects(objs)
+
+
 def makeFrame(placement=FreeCAD.Placement()):
     obj = FreeCAD.ActiveDocument.addObject("App::FeaturePython", "Frame")
     Frame(obj)
+    obj.Placement = placement
     if FreeCAD.GuiUp:
         ViewProviderFrame(obj.ViewObject)
     return obj
 
 
-def makePartFrame(part):
+def makePartFrame(part, add_to_group=True):
     obj = FreeCAD.ActiveDocument.addObject("App::FeaturePython", "PartFrame")
     PartFrame(obj, part)
-    if int(FreeCAD.Version()[1]) > 16:
-        geo_feature_group = part.getParentGeoFeatureGroup()
-        geo_feature_group.addObject(obj)
+    if add_to_group:
+        addToPartGroup(part, [obj])
     if FreeCAD.GuiUp:
         ViewProviderPartFrame(obj.ViewObject)
     return obj
 
 
-def makeFeatureFrame(part, featurepl):
-    obj = FreeCAD.ActiveDocument.addObject("App::FeaturePython",
-                                           "FeatureFrame")
-    FeatureFrame(obj, part, featurepl)
-    # If we're >0.16, add the feature frame to the assembly
-    if int(FreeCAD.Version()[1]) > 16:
-        geo_feature_group = part.getParentGeoFeatureGroup()
-        geo_feature_group.addObject(obj)
-    if FreeCAD.GuiUp:
-        ViewProviderFeatureFrame(obj.ViewObject)
+def makeFeatureFrame(part, featurepl, add_to_group=True):
+    with ARProfiler.timed("makeFeatureFrame"):
+        obj = FreeCAD.ActiveDocument.addObject("App::FeaturePython",
+                                               "FeatureFrame")
+        FeatureFrame(obj, part, featurepl)
+        # If we're >0.16, add the feature frame to the assembly
+        if add_to_group:
+            addToPartGroup(part, [obj])
+        if FreeCAD.GuiUp:
+            ViewProviderFeatureFrame(obj.ViewObject)
     return obj
 
 
+@contextlib.contextmanager
+def batchCreation(doc, name="Create frames"):
+    """Creates many objects as one undo transaction. Recomputes and GUI
+    repaints are held off until the block is done, then done once."""
+    doc.openTransaction(name)
+    frozen = getattr(doc, "RecomputesFrozen", None)
+    if frozen is not None:
+        doc.RecomputesFrozen = True
+    mw = None
+    if FreeCAD.GuiUp:
+        mw = FreeCADGui.getMainWindow()
+        mw.setUpdatesEnabled(False)
+    try:
+        yield
+    except Exception:
+        if frozen is not None:
+            doc.RecomputesFrozen = frozen
+        if mw is not None:
+            mw.setUpdatesEnabled(True)
+        doc.abortTransaction()
+        raise
+    if frozen is not None:
+        doc.RecomputesFrozen = frozen
+    with ARProfiler.timed("recompute"):
+        doc.recompute()
+    if mw is not None:
+        mw.setUpdatesEnabled(True)
+    doc.commitTransaction()
+
+
+def _addToPartGroups(frames):
+    """Adds the part frames to the groups of their parts, one call per
+    group."""
+    by_part = {}
+    for obj in frames:
+        by_part.setdefault(obj.Part.Name, (obj.Part, []))[1].append(obj)
+    for part, objs in by_part.values():
+        addToPartGroup(part, objs)
+
+
+def makeFrames(placements):
+    """Creates a freestanding frame at each placement in one batch."""
+    with batchCreation(FreeCAD.ActiveDocument, "Make frames"):
+        frames = [makeFrame(pl) for pl in placements]
+    return frames
+
+
+def makePartFrames(parts, labels=None):
+    """Creates a part frame for each part in one batch, see
+    batchCreation."""
+    with batchCreation(FreeCAD.ActiveDocument, "Make part frames"):
+        frames = [makePartFrame(part, add_to_group=False) for part in parts]
+        if labels is not None:
+            for pf, label in zip(frames, labels):
+                pf.Label = label
+        _addToPartGroups(frames)
+    return frames
+
+
+def makeFeatureFrames(specs):
+    """Creates feature frames in one batch, see batchCreation. Each spec is
+    a tuple (part, featurepl, properties, additional_data), where properties
+    is a dictionary of frame properties to set, e.g. PrimitiveType."""
+    with batchCreation(FreeCAD.ActiveDocument, "Make feature frames"):
+        frames = []
+        for part, featurepl, properties, additional_data in specs:
+            fframe = makeFeatureFrame(part, featurepl, add_to_group=False)
+            for prop, value in properties.items():
+                setattr(fframe, prop, value)
+            fframe.Proxy.setAdditionalData(additional_data)
+            frames.append(fframe)
+        _addToPartGroups(frames)
+    return frames
+
+
 def makeAllPartFrames():
     dc = FreeCAD.activeDocument()
-    for part in dc.Objects:
-        if isinstance(part, Part.Feature):
-            pf = makePartFrame(part)
-            pf.Label = "Frame"+str(part.Label)
+    parts = ARTools.getDocumentParts(dc)
+    with ARProfiler.session("Make all part frames"):
+        makePartFrames(parts, ["Frame"+str(part.Label) for part in parts])
+
+
+# Primitives whose center is given by the curve or surface center
+CENTER_EDGE_PRIMITIVES = ["ArcOfCircle",
+                          "ArcOfEllipse",
+                          "ArcOfHyperbola",
+                          "ArcOfParabola",
+                          "Circle",
+                          "Ellipse",
+                          "Hyperbola",
+                          "Parabola"]
+CENTER_FACE_PRIMITIVES = ["Sphere",
+                          "Toroid"]
+# Positioning used for each primitive type when generating frames
+AUTO_POSITIONING = {"Cylinder": "PointOnCenterline",
+                    "Cone": "PointOnCenterline",
+                    "Circle": "Center",
+                    "Sphere": "Center",
+                    "Toroid": "Center"}
+
+
+def centerPlacement(subobj, prim_type):
+    """Gives the placement of the center of the subobject with z along its
+    axis, in the same frame as the subobject."""
+    if prim_type in CENTER_EDGE_PRIMITIVES:
+        axis = subobj.Curve.Axis
+        rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
+                                    axis)
+        center_point = subobj.Curve.Center
+    elif prim_type in CENTER_FACE_PRIMITIVES:
+        axis = subobj.Surface.Axis
+        rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
+                                    axis)
+        center_point = subobj.Surface.Center
+    else:
+        rotation = FreeCAD.Rotation()
+        center_point = subobj.CenterOfMass
+    return FreeCAD.Placement(center_point, rotation)
+
+
+def centerlinePlacement(subobj, value=0.0):
+    """Gives the placement of the point value mm along the centerline of a
+    cylinder or cone face from the surface center, with z along the axis,
+    in the same frame as the subobject."""
+    displacement_pl = FreeCAD.Placement(FreeCAD.Vector(0, 0, value),
+                                        FreeCAD.Rotation())
+    axis = subobj.Surface.Axis
+    rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
+                                axis)
+    center_pl = FreeCAD.Placement(subobj.Surface.Center, rotation)
+    return center_pl.multiply(displacement_pl)
+
+
+def _axisExtent(subobj, center, axis):
+    """Gives the (min, max) position of the subobject's vertexes along the
+    axis, measured from center."""
+    ts = [(v.Point - center).dot(axis) for v in subobj.Vertexes]
+    if len(ts) == 0:
+        return 0.0, 0.0
+    return min(ts), max(ts)
+
+
+def _onKnownAxis(axes, point, direction, radius, extent, tol):
+    """Checks whether a feature overlaps one of the known features, i.e.
+    lies on the same axis with the same radius and overlaps it along the
+    axis. Features are (point, direction, radius, min, max) with min and
+    max along the direction from the point."""
+    import numpy as np
+    if len(axes) == 0:
+        return False
+    arr = np.array(axes, dtype=np.float64)
+    p, d, r = arr[:, 0:3], arr[:, 3:6], arr[:, 6]
+    lo, hi = arr[:, 7], arr[:, 8]
+    cos = np.dot(d, direction)
+    parallel = np.abs(cos) > 1.0 - tol
+    diff = np.asarray(point) - p
+    along = np.sum(diff*d, axis=1)
+    offaxis = np.linalg.norm(diff - along[:, None]*d, axis=1)
+    # The extent of the feature along each known direction
+    sign = np.where(cos < 0, -1.0, 1.0)
+    ends = along[:, None] + sign[:, None]*np.array(extent)[None, :]
+    overlap = (ends.min(axis=1) <= hi + tol) & (ends.max(axis=1) >= lo - tol)
+    same = parallel & (offaxis < tol) & (np.abs(r - radius) < tol) & overlap
+    return bool(np.any(same))
+
+
+def findFeatures(part, prim_types=("Cylinder", "Cone", "Circle"), tol=1e-4):
+    """Scans a part for features to put frames on. Returns a list of
+    (subelement name, subobject, PrimitiveType, ShapeType, absolute
+    placement). Faces overlapping an earlier face on the same axis with the
+    same radius (e.g. a hole split in two faces), and closed circles on
+    such a face (e.g. hole edges), are only found once. Holes on the same
+    axis at different positions are found separately. Subelements that
+    already have a feature frame, and their overlapping subelements, are
+    skipped."""
+    shape = part.Shape
+    indices, counts = ARTools.shapeCensus(shape)
+    framed = set(getattr(ff, "SubElement", "")
+                 for ff in ARTools.getFeatureFrames(part))
+    candidates = []
+    for shape_type, elements in (("Face", shape.Faces),
+                                 ("Edge", shape.Edges)):
+        for prim_type in prim_types:
+            if prim_type not in AUTO_POSITIONING:
+                FreeCAD.Console.PrintWarning("No positioning for "
+                                             + prim_type + "\n")
+                continue
+            for i in indices[shape_type].get(prim_type, []):
+                subobj = elements[i - 1]
+                if shape_type == "Edge":
+                    if not subobj.isClosed():
+                        continue
+                    geom = subobj.Curve
+                else:
+                    geom = subobj.Surface
+                center = geom.Center
+                axis = geom.Axis
+                entry = ((center.x, center.y, center.z),
+                         (axis.x, axis.y, axis.z),
+                         getattr(geom, "Radius", 0.0),
+                         _axisExtent(subobj, center, axis))
+                candidates.append((shape_type + str(i), subobj, prim_type,
+                                   shape_type, entry))
+    # Known features, starting with the ones that already have frames
+    axes = []
+    for name, subobj, prim_type, shape_type, entry in candidates:
+        if name in framed:
+            axes.append(entry[0] + entry[1] + (entry[2],) + entry[3])
+    features = []
+    for name, subobj, prim_type, shape_type, entry in candidates:
+        if name in framed:
+            continue
+        point, direction, radius, extent = entry
+        if _onKnownAxis(axes, point, direction, radius, extent, tol):
+            continue
+        axes.append(point + direction + (radius,) + extent)
+        if AUTO_POSITIONING[prim_type] == "PointOnCenterline":
+            # Middle of the face, so holes on one axis get their own frame
+            abs_pl = centerlinePlacement(subobj, 0.5*(extent[0] + extent[1]))
+        else:
+            abs_pl = centerPlacement(subobj, prim_type)
+        features.append((name, subobj, prim_type, shape_type, abs_pl))
+    return features
+
+
+def makeFeatureFramesForPart(part, prim_types=("Cylinder", "Cone", "Circle")):
+    """Creates feature frames on all features of a part found by
+    findFeatures, the same way the feature frame panels do."""
+    return makeFeatureFrames(getFeatureFrameSpecs(part, prim_types))
+
+
+def getFeatureFrameSpecs(part, prim_types=("Cylinder", "Cone", "Circle")):
+    """Gives the makeFeatureFrames specs of the features of a part found by
+    findFeatures."""
+    parent_pl_inv = part.Placement.inverse()
+    with ARProfiler.timed("findFeatures"):
+        features = findFeatures(part, prim_types)
+    specs = []
+    for name, subobj, prim_type, shape_type, abs_pl in features:
+        local_ffpl = parent_pl_inv.multiply(abs_pl)
+        properties = {"PrimitiveType": prim_type,
+                      "ShapeType": shape_type,
+                      "Positioning": AUTO_POSITIONING[prim_type],
+                      "SubElement": name}
+        ad = ARTools.getPrimitiveInfo(prim_type, subobj)
+        specs.append((part, local_ffpl, properties, ad))
+    return specs
+
+
+def makeFramesAlongEdge(part, edge, n):
+    """Creates n feature frames evenly spaced by arc length along an edge
+    of the part, with x along the edge, as the PointOnEdge panel does.
+    edge is an edge of part.Shape or its name, e.g. "Edge3"."""
+    if isinstance(edge, str):
+        name = edge
+        edge = part.Shape.getElement(name)
+    else:
+        name = ""
+        for i, e in enumerate(part.Shape.Edges):
+            if e.isSame(edge):
+                name = "Edge" + str(i + 1)
+                break
+    prim_type, shape_type = ARTools.describeSubObject(edge)
+    sampler = ARTools.EdgeSampler(edge)
+    parent_pl_inv = part.Placement.inverse()
+    ad = ARTools.getPrimitiveInfo(prim_type, edge)
+    properties = {"PrimitiveType": prim_type,
+                  "ShapeType": shape_type,
+                  "Positioning": "PointOnEdge",
+                  "SubElement": name}
+    specs = []
+    for t in sampler.evenParameters(n):
+        rot = FreeCAD.Rotation(FreeCAD.Vector(1, 0, 0), edge.tangentAt(t))
+        abs_ffpl = FreeCAD.Placement(edge.valueAt(t), rot)
+        specs.append((part, parent_pl_inv.multiply(abs_ffpl), properties,
+                      ad))
+    return makeFeatureFrames(specs)
+
+
+def makeAllFeatureFrames():
+    """Creates feature frames on all features of the selected parts, or of
+    every part in the document if nothing is selected."""
+    s = FreeCADGui.Selection.getSelection()
+    if len(s) == 0:
+        parts = ARTools.getDocumentParts(FreeCAD.ActiveDocument)
+    else:
+        parts = [item for item in s if isinstance(item, Part.Feature)]
+    with ARProfiler.session("Make all feature frames"):
+        specs = []
+        for part in parts:
+            specs.extend(getFeatureFrameSpecs(part))
+        nframes = len(makeFeatureFrames(specs))
+    FreeCAD.Console.PrintMessage("Created " + str(nframes)
+                                 + " feature frames on " + str(len(parts))
+                                 + " parts\n")
 
 
 def spawnFeatureFrameCreator():
@@ -286,22 +895,48 @@ uidir = os.path.join(FreeCAD.getUserAppDataDir(),
                      "Mod", __workbenchname__, "UI")
 icondir = os.path.join(uidir, "icons")
 
-ARTools.spawnClassCommand("FrameCommand",
-                          makeFrame,
-                          {"Pixmap": str(os.path.join(icondir, "frame.svg")),
-                           "MenuText": "Make a free frame",
-                           "ToolTip": "Make a freestanding reference frame."})
-
-ARTools.spawnClassCommand("AllPartFramesCommand",
-                          makeAllPartFrames,
-                          {"Pixmap": str(os.path.join(icondir, "allpartframes.svg")),
-                           "MenuText": "All part frames",
-                           "ToolTip": "Make all part frames."})
-ARTools.spawnClassCommand("FeatureFrameCommand",
-                          spawnFeatureFrameCreator,
-                          {"Pixmap": str(os.path.join(icondir, "featureframecreator.svg")),
-                           "MenuText": "Feature frame creator",
-                           "ToolTip": "Create a feature frame on selected primitive."})
+# The commands are registered from ARCommands
+
+# Parsed forms and rendered previews, kept for the whole session
+_form_types = {}
+_preview_scenes = {}
+
+
+def loadForm(uiname):
+    """Gives a new form from a .ui file in the UI directory. The file is
+    only parsed the first time, later forms are built from the cached form
+    class."""
+    uiform_path = os.path.join(uidir, uiname)
+    if not hasattr(FreeCADGui.PySideUic, "loadUiType"):
+        return FreeCADGui.PySideUic.loadUi(uiform_path)
+    if uiname not in _form_types:
+        _form_types[uiname] = FreeCADGui.PySideUic.loadUiType(uiform_path)
+    form_class, base_class = _form_types[uiname]
+    form = base_class()
+    ui = form_class()
+    ui.setupUi(form)
+    # Widgets are reached as attributes of the form, as with loadUi
+    for name, widget in vars(ui).items():
+        setattr(form, name, widget)
+    return form
+
+
+def getPreviewScene(choice):
+    """Gives the preview scene of a feature frame choice. The icon is
+    rendered to a pixmap once and the scene is reused by later panels."""
+    if choice not in _preview_scenes:
+        icon = str(os.path.join(icondir, choice+".svg"))
+        renderer = QtSvg.QSvgRenderer(icon)
+        image = QtGui.QImage(renderer.defaultSize(),
+                             QtGui.QImage.Format_ARGB32_Premultiplied)
+        image.fill(0)
+        painter = QtGui.QPainter(image)
+        renderer.render(painter)
+        painter.end()
+        sc = QtGui.QGraphicsScene()
+        sc.addPixmap(QtGui.QPixmap.fromImage(image))
+        _preview_scenes[choice] = sc
+    return _preview_scenes[choice]
 
 
 ###################################################################
@@ -337,7 +972,7 @@ class FeatureFramePanel:
         prim_choices = {
             "ArcOfCircle": ["Center"],
             "ArcOfEllipse": ["Center"],
-            "ArcOfHyperBola": ["Center"],
+            "ArcOfHyperbola": ["Center"],
             "ArcOfParabola": ["Center"],
             "BSplineCurve": ["Center"],
             "BezierCurve": ["Center"],
@@ -355,27 +990,20 @@ class FeatureFramePanel:
             "Cone": ["PointOnCenterline"]
         }
         self.choices = ["PickedPoint"]
-        self.choices = self.choices + shape_choices[so_desc[1]]
-        self.choices = self.choices + prim_choices[so_desc[0]]
+        self.choices = self.choices + shape_choices.get(so_desc[1], [])
+        self.choices = self.choices + prim_choices.get(so_desc[0], [])
         # Setting up QT form
-        uiform_path = os.path.join(uidir, "FeatureFrameCreator.ui")
-        self.form = FreeCADGui.PySideUic.loadUi(uiform_path)
+        self.form = loadForm("FeatureFrameCreator.ui")
         self.form.ChoicesBox.addItems(self.choices)
         self.form.PickedTypeLabel.setText(so_desc[0])
         QtCore.QObject.connect(self.form.ChoicesBox,
                                QtCore.SIGNAL("currentIndexChanged(QString)"),
                                self.choiceChanged)
-        self.scenes = {}
-        for choice in self.choices:
-            sc = QtGui.QGraphicsScene()
-            icon = str(os.path.join(icondir, choice+".svg"))
-            sc.addItem(QtSvg.QGraphicsSvgItem(icon))
-            self.scenes[choice] = sc
         self.choiceChanged(self.form.ChoicesBox.currentText())
 
     def choiceChanged(self, choice):
-        if choice in self.scenes.keys():
-            self.form.Preview.setScene(self.scenes[choice])
+        if choice in self.choices:
+            self.form.Preview.setScene(getPreviewScene(choice))
 
     def accept(self):
         sel_choice = self.form.ChoicesBox.currentText()
@@ -423,14 +1051,37 @@ class BaseFeaturePanel(object):
         QtCore.QObject.connect(self.form.ScaleBox,
                                QtCore.SIGNAL("valueChanged(double)"),
                                self.scaleChanged)
+        self.parent_pl_inv = selected.Object.Placement.inverse()
+        # Parameter changes are collected and shown once per display refresh
+        self.preview_timer = QtCore.QTimer()
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(16)
+        self.preview_timer.timeout.connect(self.parameterChanged)
+
+    def schedulePreview(self):
+        """Updates the frame at the next display refresh. Events before then
+        are folded into that update, so the preview keeps up while the user
+        is scrubbing."""
+        if not self.preview_timer.isActive():
+            self.preview_timer.start()
+
+    def parameterChanged(self, exact=False):
+        """Moves the frame to the current parameters. Panels with
+        parameters may use precomputed samples unless exact is set."""
+        pass
+
+    def setFeaturePlacement(self, abs_ffpl):
+        self.local_ffpl = self.parent_pl_inv.multiply(abs_ffpl)
+        self.fframe.FeaturePlacement = self.local_ffpl
 
     def createFrame(self):
         self.fframe = makeFeatureFrame(self.selected.Object, self.local_ffpl)
         self.fframe.PrimitiveType = self.so_desc[0]
         self.fframe.ShapeType = self.so_desc[1]
+        self.fframe.SubElement = self.selected.SubElementNames[0]
         ad = ARTools.getPrimitiveInfo(self.so_desc[0],
                                       self.selected.SubObjects[0])
-        self.fframe.Proxy.additional_data.update(ad)
+        self.fframe.Proxy.setAdditionalData(ad)
 
     def scaleChanged(self):
         scale = self.form.ScaleBox.value()
@@ -447,12 +1098,16 @@ class BaseFeaturePanel(object):
         self.fframe.Placement = offset
 
     def accept(self):
+        # The preview may be interpolated, place the frame exactly
+        self.preview_timer.stop()
+        self.parameterChanged(exact=True)
         framelabel = self.form.FrameLabelField.toPlainText()
         if not len(framelabel) == 0:
             self.fframe.Label = framelabel
         FreeCADGui.Control.closeDialog()
 
     def reject(self):
+        self.preview_timer.stop()
         FreeCAD.activeDocument().removeObject(self.fframe.Name)
         FreeCADGui.Control.closeDialog()
 
@@ -461,8 +1116,7 @@ class PickedPointPanel(BaseFeaturePanel):
     """Create a feature frame at the picked point."""
     # Not very clever. It just places the frame with default rotation.
     def __init__(self, selected, so_desc):
-        uiform_path = os.path.join(uidir, "FramePlacer.ui")
-        self.form = FreeCADGui.PySideUic.loadUi(uiform_path)
+        self.form = loadForm("FramePlacer.ui")
         BaseFeaturePanel.__init__(self, selected, so_desc)
         parent_pl = selected.Object.Placement
         abs_pl = FreeCAD.Placement(selected.PickedPoints[0],
@@ -475,8 +1129,7 @@ class PickedPointPanel(BaseFeaturePanel):
 class PointOnEdgePanel(BaseFeaturePanel):
     """Create a feature frame on an edge."""
     def __init__(self, selected, so_desc):
-        uiform_path = os.path.join(uidir, "FramePlacer.ui")
-        self.form = FreeCADGui.PySideUic.loadUi(uiform_path)
+        self.form = loadForm("FramePlacer.ui")
         # Enable the first parameter
         self.form.VLabel.setEnabled(True)
         self.form.VLabel.setVisible(True)
@@ -485,7 +1138,7 @@ class PointOnEdgePanel(BaseFeaturePanel):
         self.form.VBox.setVisible(True)
         QtCore.QObject.connect(self.form.VBox,
                                QtCore.SIGNAL("valueChanged(double)"),
-                               self.parameterChanged)
+                               self.schedulePreview)
 
         # Enable percentage or param selection
         self.form.OptionsLabel.setEnabled(True)
@@ -493,57 +1146,70 @@ class PointOnEdgePanel(BaseFeaturePanel):
         self.form.OptionsLabel.setText("Arc param.")
         self.form.OptionsBox.setEnabled(True)
         self.form.OptionsBox.setVisible(True)
-        self.form.OptionsBox.addItems(["mm", "%"])
+        self.form.OptionsBox.addItems(["mm", "%", "% length"])
+        self.option = "mm"
         QtCore.QObject.connect(self.form.OptionsBox,
                                QtCore.SIGNAL("currentIndexChanged(QString)"),
                                self.choiceChanged)
         BaseFeaturePanel.__init__(self, selected, so_desc)
+        self.edge = selected.SubObjects[0]
+        self.parameter_range = self.edge.ParameterRange
+        self.sampler = ARTools.EdgeSampler(self.edge)
 
         # Place the frame wherever the values are atm
         self.local_ffpl = FreeCAD.Placement()
         self.createFrame()
         self.fframe.Positioning = "PointOnEdge"
         self.choiceChanged(self.form.OptionsBox.currentText())
-        self.parameterChanged()
+        self.parameterChanged(exact=True)
 
-    def parameterChanged(self):
-        value = self.form.VBox.value()
-        if self.form.OptionsBox.currentText() == "%":
-            value = self.p2mm(value)
-        edge = self.selected.SubObjects[0]
-        point = edge.valueAt(value)
-        tangentdir = edge.tangentAt(value)
+    def parameterChanged(self, exact=False):
+        value = self.toParameter(self.form.VBox.value(), self.option)
+        if exact:
+            point = self.edge.valueAt(value)
+            tangentdir = self.edge.tangentAt(value)
+        else:
+            point, tangentdir = self.sampler.at(value)
         rot = FreeCAD.Rotation(FreeCAD.Vector(1, 0, 0),
                                tangentdir)
-        abs_ffpl = FreeCAD.Placement(point, rot)
-        parent_pl = self.selected.Object.Placement
-        self.local_ffpl = parent_pl.inverse().multiply(abs_ffpl)
-        self.fframe.FeaturePlacement = self.local_ffpl
-        # force recompute of placement?
-        self.fframe.Placement = self.fframe.Placement
+        self.setFeaturePlacement(FreeCAD.Placement(point, rot))
 
     def choiceChanged(self, choice):
-        value = self.form.VBox.value()
+        param = self.toParameter(self.form.VBox.value(), self.option)
+        self.option = choice
         if choice == "mm":
-            value = self.p2mm(value)
             self.form.VBox.setSuffix("mm")
-            parameter_range = self.selected.SubObjects[0].ParameterRange
-            self.form.VBox.setRange(*parameter_range)
+            self.form.VBox.setRange(*self.parameter_range)
             self.form.VBox.setSingleStep(0.1)
-        elif choice == "%":
-            value = self.mm2p(value)
+        elif choice in ("%", "% length"):
             self.form.VBox.setSuffix("%")
             self.form.VBox.setRange(0, 100.0)
             self.form.VBox.setSingleStep(1.0)
-        self.form.VBox.setValue(value)
+        self.form.VBox.setValue(self.fromParameter(param, choice))
+
+    def toParameter(self, value, option):
+        """Gives the edge parameter of a spinbox value in option's unit."""
+        if option == "%":
+            return self.p2mm(value)
+        elif option == "% length":
+            return self.sampler.parameterAtFraction(0.01*value)
+        return value
+
+    def fromParameter(self, param, option):
+        """Gives the spinbox value in option's unit of an edge parameter."""
+        if option == "%":
+            return self.mm2p(param)
+        elif option == "% length":
+            return 100.0*self.sampler.lengthAtParameter(param)/self.sampler.length
+        return param
 
     def p2mm(self, value):
-        parameter_range = self.selected.SubObjects[0].ParameterRange
+        parameter_range = self.parameter_range
         delta = parameter_range[1] - parameter_range[0]
         return 0.01*value*delta + parameter_range[0]
 
     def mm2p(self, value):
-        parameter_range = self.selected.SubObjects[0].ParameterRange
+        parameter_range = self.parameter_range
         delta = parameter_range[1] - parameter_range[0]
         return 100.0*(value - parameter_range[0])/delta
 
@@ -551,8 +1217,7 @@ class PointOnEdgePanel(BaseFeaturePanel):
 class PointOnSurfacePanel(BaseFeaturePanel):
     """Create a feature on a surface."""
     def __init__(self, selected, so_desc):
-        uiform_path = os.path.join(uidir, "FramePlacer.ui")
-        self.form = FreeCADGui.PySideUic.loadUi(uiform_path)
+        self.form = loadForm("FramePlacer.ui")
         # Enable both parameters
         self.form.ULabel.setVisible(True)
         self.form.VLabel.setVisible(True)
@@ -560,10 +1225,10 @@ class PointOnSurfacePanel(BaseFeaturePanel):
         self.form.VBox.setVisible(True)
         QtCore.QObject.connect(self.form.VBox,
                                QtCore.SIGNAL("valueChanged(double)"),
-                               self.parameterChanged)
+                               self.schedulePreview)
         QtCore.QObject.connect(self.form.UBox,
                                QtCore.SIGNAL("valueChanged(double)"),
-                               self.parameterChanged)
+                               self.schedulePreview)
         # Enable percentage or param selection
         self.form.OptionsLabel.setEnabled(True)
         self.form.OptionsLabel.setVisible(True)
@@ -575,35 +1240,35 @@ class PointOnSurfacePanel(BaseFeaturePanel):
                                QtCore.SIGNAL("currentIndexChanged(QString)"),
                                self.choiceChanged)
         BaseFeaturePanel.__init__(self, selected, so_desc)
+        self.face = selected.SubObjects[0]
+        self.parameter_range = self.face.ParameterRange
+        self.sampler = ARTools.SurfaceSampler(self.face)
 
         # Place the frame wherever the values are atm
         self.local_ffpl = FreeCAD.Placement()
         self.createFrame()
         self.fframe.Positioning = "PointOnSurface"
         self.choiceChanged(self.form.OptionsBox.currentText())
-        self.parameterChanged()
+        self.parameterChanged(exact=True)
 
-    def parameterChanged(self):
+    def parameterChanged(self, exact=False):
         value = (self.form.UBox.value(), self.form.VBox.value())
         if self.form.OptionsBox.currentText() == "%":
             value = self.p2mm(value)
-        face = self.selected.SubObjects[0]
-        point = face.valueAt(*value)
-        normaldir = face.normalAt(*value)
+        if exact:
+            point = self.face.valueAt(*value)
+            normaldir = self.face.normalAt(*value)
+        else:
+            point, normaldir = self.sampler.at(*value)
         rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
                                     normaldir)
-        abs_ffpl = FreeCAD.Placement(point, rotation)
-        parent_pl = self.selected.Object.Placement
-        self.local_ffpl = parent_pl.inverse().multiply(abs_ffpl)
-        self.fframe.FeaturePlacement = self.local_ffpl
-        # Force recompute of placement
-        self.fframe.Placement = self.fframe.Placement
+        self.setFeaturePlacement(FreeCAD.Placement(point, rotation))
 
     def choiceChanged(self, choice):
         value = (self.form.UBox.value(), self.form.VBox.value())
         if choice == "mm":
             value = self.p2mm(value)
-            parameter_range = self.selected.SubObjects[0].ParameterRange
+            parameter_range = self.parameter_range
             self.form.UBox.setRange(parameter_range[0], parameter_range[1])
             self.form.UBox.setSuffix("mm")
             self.form.UBox.setSingleStep(0.1)
@@ -622,7 +1287,7 @@ class PointOnSurfacePanel(BaseFeaturePanel):
         self.form.VBox.setValue(value[1])
 
     def p2mm(self, value):
-        parameter_range = self.selected.SubObjects[0].ParameterRange
+        parameter_range = self.parameter_range
         delta = [parameter_range[1] - parameter_range[0],
                  parameter_range[3] - parameter_range[2]]
         u = 0.01*value[0]*delta[0] + parameter_range[0]
@@ -630,7 +1295,7 @@ class PointOnSurfacePanel(BaseFeaturePanel):
         return (u, v)
 
     def mm2p(self, value):
-        parameter_range = self.selected.SubObjects[0].ParameterRange
+        parameter_range = self.parameter_range
         delta = [parameter_range[1] - parameter_range[0],
                  parameter_range[3] - parameter_range[2]]
         u = 100.0*(value[0] - parameter_range[0])/delta[0]
@@ -641,37 +1306,10 @@ class PointOnSurfacePanel(BaseFeaturePanel):
 class CenterPanel(BaseFeaturePanel):
     """Create a feature frame on center."""
     def __init__(self, selected, so_desc):
-        uiform_path = os.path.join(uidir, "FramePlacer.ui")
-        self.form = FreeCADGui.PySideUic.loadUi(uiform_path)
+        self.form = loadForm("FramePlacer.ui")
         BaseFeaturePanel.__init__(self, selected, so_desc)
-        edge_curve_list = ["ArcOfCircle",
-                           "ArcOfEllipse",
-                           "ArcOfHyperbola",
-                           "ArcOfParabola",
-                           "Circle",
-                           "Ellipse",
-                           "Hyperbola",
-                           "Parabola"]
-        face_surf_list = ["Sphere",
-                          "Toroid"]
-        if so_desc[0] in edge_curve_list:
-            edge = selected.SubObjects[0]
-            axis = edge.Curve.Axis
-            rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
-                                        axis)
-            center_point = edge.Curve.Center
-        elif so_desc[0] in face_surf_list:
-            face = selected.SubObjects[0]
-            axis = face.Surface.Axis
-            rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
-                                        axis)
-            center_point = face.Surface.Center
-        else:
-            rotation = FreeCAD.Rotation()
-            center_point = selected.SubObjects[0].CenterOfMass
+        abs_pl = centerPlacement(selected.SubObjects[0], so_desc[0])
         parent_pl = selected.Object.Placement
-        abs_pl = FreeCAD.Placement(center_point,
-                                   rotation)
         self.local_ffpl = parent_pl.inverse().multiply(abs_pl)
         self.createFrame()
         self.fframe.Positioning = "Center"
@@ -680,8 +1318,7 @@ class CenterPanel(BaseFeaturePanel):
 class PointOnCenterlinePanel(BaseFeaturePanel):
     """Create a point on centerline of primitive."""
     def __init__(self, selected, so_desc):
-        uiform_path = os.path.join(uidir, "FramePlacer.ui")
-        self.form = FreeCADGui.PySideUic.loadUi(uiform_path)
+        self.form = loadForm("FramePlacer.ui")
         BaseFeaturePanel.__init__(self, selected, so_desc)
         # Enable the along line parameter
         self.form.VLabel.setVisible(True)
@@ -689,7 +1326,7 @@ class PointOnCenterlinePanel(BaseFeaturePanel):
         self.form.VBox.setVisible(True)
         QtCore.QObject.connect(self.form.VBox,
                                QtCore.SIGNAL("valueChanged(double)"),
-                               self.parameterChanged)
+                               self.schedulePreview)
         # Enable percentage of param selection
         self.form.OptionsLabel.setVisible(True)
         self.form.OptionsLabel.setText("Line param.")
@@ -698,30 +1335,22 @@ class PointOnCenterlinePanel(BaseFeaturePanel):
         QtCore.QObject.connect(self.form.OptionsBox,
                                QtCore.SIGNAL("currentIndexChanged(QString)"),
                                self.choiceChanged)
+        self.parameter_range = selected.SubObjects[0].ParameterRange[2:]
+        # The centerline is analytic, only the center needs the geometry
+        self.center_pl = centerlinePlacement(selected.SubObjects[0])
         # Place the frame wherever the values are atm
         self.local_ffpl = FreeCAD.Placement()
         self.createFrame()
         self.fframe.Positioning = "PointOnCenterline"
         self.parameterChanged()
 
-    def parameterChanged(self):
+    def parameterChanged(self, exact=False):
         value = self.form.VBox.value()
         if self.form.OptionsBox.currentText() == "%":
             value = self.p2mm(value)
         displacement_pl = FreeCAD.Placement(FreeCAD.Vector(0, 0, value),
                                             FreeCAD.Rotation())
-        # Find the center
-        axis = self.selected.SubObjects[0].Surface.Axis
-        rotation = FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1),
-                                    axis)
-        center_point = self.selected.SubObjects[0].Surface.Center
-        center_pl = FreeCAD.Placement(center_point, rotation)
-        abs_ffpl = center_pl.multiply(displacement_pl)
-        parent_pl = self.selected.Object.Placement
-        self.local_ffpl = parent_pl.inverse().multiply(abs_ffpl)
-        self.fframe.FeaturePlacement = self.local_ffpl
-        # force recompute of placement
-        self.fframe.Placement = self.fframe.Placement
+        self.setFeaturePlacement(self.center_pl.multiply(displacement_pl))
 
     def choiceChanged(self, choice):
         FreeCAD.Console.PrintMessage("choiceChanged\n")
@@ -730,8 +1359,7 @@ class PointOnCenterlinePanel(BaseFeaturePanel):
         if choice == "mm":
             value = self.p2mm(value)
             self.form.VBox.setSuffix("mm")
-            parameter_range = self.selected.SubObjects[0].ParameterRange[2:]
-            self.form.VBox.setRange(*parameter_range)
+            self.form.VBox.setRange(*self.parameter_range)
             self.form.VBox.setSingleStep(0.1)
         elif choice == "%":
             value = self.mm2p(value)
@@ -742,11 +1370,11 @@ class PointOnCenterlinePanel(BaseFeaturePanel):
         FreeCAD.Console.PrintMessage("postval:"+str(value)+"\n")
 
     def p2mm(self, value):
-        parameter_range = self.selected.SubObjects[0].ParameterRange[2:]
+        parameter_range = self.parameter_range
         delta = parameter_range[1] - parameter_range[0]
         return 0.01*value*delta + parameter_range[0]
 
     def mm2p(self, value):
-        parameter_range = self.selected.SubObjects[0].ParameterRange[2:]
+        parameter_range = self.parameter_range
         delta = parameter_range[1] - parameter_range[0]
         return 100.0*(value - parameter_range[0])/delta
@@ -0,0 +1,249 @@
+import FreeCAD
+import Part
+import ARTools
+import ARBatch
+import ARCache
+import ARProfiler
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+if FreeCAD.GuiUp:
+    import FreeCADGui
+    from PySide import QtGui
+
+__title__ = "ARMesh"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Mesh export of parts for the Annotations for Robotics workbench. Every part
+is tessellated in its own frame, like getLocalPartProps, at each level of
+detail and written as STL, OBJ or PLY in m. Parts whose shape and tolerance
+have not changed since the last export to the same directory are skipped.
+Example:
+ARMesh.exportMeshes(ARTools.getDocumentParts(doc), "~/meshes", "stl")
+"""
+
+# Tessellation tolerance in mm per level of detail
+LOD_LEVELS = {"visual": 0.1,
+              "collision": ARTools.COLLISION_TOLERANCE}
+MESH_FORMATS = ["stl", "obj", "ply"]
+MANIFEST = "manifest.json"
+
+
+###################################################################
+# Writers
+###################################################################
+def writeSTL(ofile, points, facets):
+    """Writes a binary STL file of an N x 3 array of points and an M x 3
+    array of triangle indices."""
+    tris = points[facets]
+    normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    data = np.zeros(len(facets), dtype=np.dtype([("normal", "<f4", (3,)),
+                                                 ("vertices", "<f4", (3, 3)),
+                                                 ("attr", "<u2")]))
+    data["normal"] = normals/lengths[:, None]
+    data["vertices"] = tris
+    with open(ofile, "wb") as meshfile:
+        meshfile.write(b"ARBench mesh".ljust(80, b" "))
+        meshfile.write(np.array([len(facets)], dtype="<u4").tobytes())
+        meshfile.write(data.tobytes())
+
+
+def writeOBJ(ofile, points, facets):
+    """Writes a Wavefront OBJ file, see writeSTL."""
+    with open(ofile, "w") as meshfile:
+        np.savetxt(meshfile, points, fmt="v %.9g %.9g %.9g")
+        np.savetxt(meshfile, facets + 1, fmt="f %d %d %d")
+
+
+def writePLY(ofile, points, facets):
+    """Writes a binary little-endian PLY file, see writeSTL."""
+    header = ("ply\n"
+              "format binary_little_endian 1.0\n"
+              "element vertex {0}\n"
+              "property float x\n"
+              "property float y\n"
+              "property float z\n"
+              "element face {1}\n"
+              "property list uchar int vertex_indices\n"
+              "end_header\n").format(len(points), len(facets))
+    faces = np.zeros(len(facets), dtype=np.dtype([("n", "u1"),
+                                                  ("v", "<i4", (3,))]))
+    faces["n"] = 3
+    faces["v"] = facets
+    with open(ofile, "wb") as meshfile:
+        meshfile.write(header.encode("ascii"))
+        meshfile.write(points.astype("<f4").tobytes())
+        meshfile.write(faces.tobytes())
+
+
+MESH_WRITERS = {"stl": writeSTL,
+                "obj": writeOBJ,
+                "ply": writePLY}
+
+
+###################################################################
+# Module functions
+###################################################################
+def tessellateBrep(brep, tolerance, scale=1e-3):
+    """Tessellates a shape given as a BRep string. Returns an N x 3 array of
+    points, scaled to m by default, and an M x 3 array of triangles."""
+    shape = Part.Shape()
+    shape.importBrepFromString(brep)
+    # Mesh at tolerance even if the shape carries a finer triangulation
+    points, facets = shape.tessellate(tolerance, True)
+    points = np.array([(p.x, p.y, p.z) for p in points],
+                      dtype=np.float64).reshape((-1, 3))
+    facets = np.array(facets, dtype=np.int32).reshape((-1, 3))
+    return points*scale, facets
+
+
+def _tessellateWorker(args):
+    """Pool worker, unpacks the arguments to tessellateBrep."""
+    return tessellateBrep(*args)
+
+
+def canUsePool():
+    """Whether the parts can be meshed in a process pool. Only headless and
+    where processes are forked (Linux): started processes would run
+    sys.executable, which is the FreeCAD binary, and forking the GUI would
+    copy its Qt state."""
+    if FreeCAD.GuiUp:
+        return False
+    get_start_method = getattr(multiprocessing, "get_start_method", None)
+    if get_start_method is None:
+        # Python 2 forks everywhere but on Windows
+        return os.name != "nt"
+    return get_start_method() == "fork"
+
+
+def meshFileNames(parts):
+    """Gives the base name of the mesh files of each part, from its label
+    with a number appended if another part already gives the name."""
+    used = set()
+    return [ARBatch.uniqueFileName(ARBatch.safeFileName(str(part.Label)),
+                                   used)
+            for part in parts]
+
+
+def loadManifest(odir):
+    """Gives the shape key and tolerance of every mesh file exported to
+    odir, by file name."""
+    try:
+        with open(os.path.join(odir, MANIFEST), "r") as manifestfile:
+            return json.load(manifestfile)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def exportMeshes(parts, odir, fmt="stl", lods=None, processes=None,
+                 force=False):
+    """Exports a mesh of every part at every level of detail in lods
+    (names of LOD_LEVELS, all by default) to odir/<label>_<lod>.<fmt>.
+    The parts are tessellated in a process pool, by default one process per
+    core, if canUsePool and in the FreeCAD process otherwise. Meshes whose shape and tolerance match the manifest in odir are
+    skipped unless force is set. Returns a dictionary of statistics."""
+    with ARProfiler.session("Export meshes"):
+        return _exportMeshes(parts, odir, fmt, lods, processes, force)
+
+
+def _exportMeshes(parts, odir, fmt, lods, processes, force):
+    fmt = fmt.lower()
+    if fmt not in MESH_WRITERS:
+        raise ValueError("Unknown mesh format " + fmt
+                         + ", expected one of " + ", ".join(MESH_FORMATS))
+    if lods is None:
+        lods = sorted(LOD_LEVELS.keys())
+    odir = os.path.abspath(os.path.expanduser(odir))
+    if not os.path.exists(odir):
+        os.makedirs(odir)
+    t0 = time.time()
+    manifest = {} if force else loadManifest(odir)
+    jobs = []
+    entries = []
+    nskipped = 0
+    for part, basename in zip(parts, meshFileNames(parts)):
+        with ARProfiler.timed("brep"):
+            # Without the display mesh, which would change the key and be
+            # sent to the workers for nothing
+            brep = ARCache.geometryBrep(ARTools.getLocalShape(part))
+        key = ARCache.brepKey(brep)
+        for lod in lods:
+            tolerance = LOD_LEVELS[lod]
+            fname = basename + "_" + lod + "." + fmt
+            entry = {"key": key, "tolerance": tolerance}
+            if (manifest.get(fname) == entry
+                    and os.path.exists(os.path.join(odir, fname))):
+                nskipped += 1
+                continue
+            jobs.append((brep, tolerance))
+            entries.append((fname, entry))
+    if not canUsePool():
+        processes = 1
+    elif processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(jobs)))
+    if len(jobs) > 0:
+        with ARProfiler.timed("tessellate"):
+            if processes == 1:
+                meshes = list(map(_tessellateWorker, jobs))
+            else:
+                pool = multiprocessing.Pool(processes)
+                try:
+                    meshes = pool.map(_tessellateWorker, jobs)
+                finally:
+                    pool.close()
+                    pool.join()
+    else:
+        meshes = []
+    writer = MESH_WRITERS[fmt]
+    for (fname, entry), (points, facets) in zip(entries, meshes):
+        with ARProfiler.timed("mesh write"):
+            writer(os.path.join(odir, fname), points, facets)
+        manifest[fname] = entry
+    ARTools.writeJSON(manifest, os.path.join(odir, MANIFEST))
+    elapsed = time.time() - t0
+    FreeCAD.Console.PrintMessage(
+        "Exported {0} meshes of {1} parts in {2:.2f} s, "
+        "{3} unchanged\n".format(len(entries), len(parts), elapsed,
+                                 nskipped))
+    return {"parts": len(parts),
+            "written": len(entries),
+            "skipped": nskipped,
+            "processes": processes,
+            "seconds": elapsed}
+
+
+def exportMeshesDialogue():
+    """Spawns a dialogue window for exporting meshes of all selected parts,
+    or of every part in the document if nothing is selected."""
+    s = FreeCADGui.Selection.getSelection()
+    if len(s) == 0:
+        parts = ARTools.getDocumentParts(FreeCAD.ActiveDocument)
+    else:
+        parts = []
+        for item in s:
+            if item not in parts and isinstance(item, Part.Feature):
+                parts.append(item)
+    if len(parts) == 0:
+        FreeCAD.Console.PrintError("No parts to export.")
+        return False
+    odir = QtGui.QFileDialog.getExistingDirectory(None,
+                                                  "Save the meshes in",
+                                                  os.getenv("HOME"))
+    if odir == "":
+        # User cancelled
+        return False
+    fmt, ok = QtGui.QInputDialog.getItem(None, "Mesh format",
+                                         "Format of the mesh files:",
+                                         MESH_FORMATS, 0, False)
+    if not ok:
+        return False
+    exportMeshes(parts, odir, fmt)
+    return True
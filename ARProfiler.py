@@ -0,0 +1,217 @@
+import FreeCAD
+import contextlib
+import json
+import os
+import threading
+import time
+
+__title__ = "ARProfiler"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Timing and counting hooks for the Annotations for Robotics workbench.
+The expensive steps of the exports and frame creation are wrapped in
+timed(name). Outside of a profiling session the hooks do nothing. A session
+prints a summary of where the time went on the FreeCAD console, and can
+write the timed steps as Chrome trace events (chrome://tracing, Perfetto).
+Profiling is turned on with the preferences
+User parameter:BaseApp/Preferences/Mod/ARBench/Profile (bool)
+User parameter:BaseApp/Preferences/Mod/ARBench/ProfileTrace (trace file)
+or from a script:
+with ARProfiler.session("Export", enabled=True, trace="/tmp/trace.json"):
+    ARTools.exportAssembly(parts, "/tmp/assembly.json")
+"""
+
+PARAMETER_GROUP = "User parameter:BaseApp/Preferences/Mod/" + __workbenchname__
+
+_clock = getattr(time, "perf_counter", time.time)
+
+
+###################################################################
+# Profiler
+###################################################################
+class Profiler(object):
+    """Collects the number of calls and the inclusive wall time of named
+    steps, counters, and trace events if tracing."""
+    def __init__(self):
+        self.enabled = False
+        self.tracing = False
+        self.reset()
+
+    def reset(self):
+        self.totals = {}
+        self.counters = {}
+        self.events = []
+        self.start = _clock()
+
+    def add(self, name, t0, t1):
+        entry = self.totals.get(name)
+        if entry is None:
+            entry = self.totals[name] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += t1 - t0
+        if self.tracing:
+            self.events.append((name, t0, t1, threading.current_thread().ident))
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """Gives the totals and counters, e.g. to send from a worker
+        process to be merged in the parent."""
+        return {"totals": dict((k, list(v)) for k, v in self.totals.items()),
+                "counters": dict(self.counters)}
+
+    def merge(self, snapshot):
+        """Adds the totals and counters of a snapshot."""
+        for name, (calls, seconds) in snapshot["totals"].items():
+            entry = self.totals.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+        for name, n in snapshot["counters"].items():
+            self.count(name, n)
+
+    def summary(self, title, elapsed):
+        """Gives the totals as a table sorted by time spent. Times are
+        inclusive, a step's time includes the steps timed inside it."""
+        lines = ["ARBench profile of {0}: {1:.3f} s".format(title, elapsed),
+                 "{0:<40} {1:>8} {2:>12} {3:>10}".format("step", "calls",
+                                                         "total ms",
+                                                         "mean ms")]
+        entries = sorted(self.totals.items(), key=lambda e: -e[1][1])
+        for name, (calls, seconds) in entries:
+            lines.append("{0:<40} {1:>8} {2:>12.1f} {3:>10.3f}".format(
+                name, calls, 1e3*seconds, 1e3*seconds/calls))
+        for name in sorted(self.counters.keys()):
+            lines.append("{0:<40} {1:>8}".format(name, self.counters[name]))
+        return "\n".join(lines) + "\n"
+
+    def traceEvents(self):
+        """Gives the timed steps as complete ("X") trace events, with
+        timestamps in microseconds since the start of the session."""
+        pid = os.getpid()
+        events = []
+        for name, t0, t1, tid in self.events:
+            events.append({"name": name,
+                           "cat": __workbenchname__,
+                           "ph": "X",
+                           "ts": 1e6*(t0 - self.start),
+                           "dur": 1e6*(t1 - t0),
+                           "pid": pid,
+                           "tid": tid})
+        return events
+
+    def writeTrace(self, ofile):
+        """Writes the trace events to ofile in the trace event format."""
+        odir = os.path.dirname(ofile)
+        if odir != "" and not os.path.exists(odir):
+            os.makedirs(odir)
+        with open(ofile, "w") as tracefile:
+            json.dump({"traceEvents": self.traceEvents(),
+                       "displayTimeUnit": "ms"}, tracefile)
+
+
+class _Timer(object):
+    """Adds the time spent in the with block to the profiler."""
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.profiler.add(self.name, self.t0, _clock())
+        return False
+
+
+class _NullTimer(object):
+    """Stands in for _Timer when profiling is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+_profiler = Profiler()
+_session_depth = [0]
+
+
+###################################################################
+# Module functions
+###################################################################
+def getProfiler():
+    """Gives the shared profiler."""
+    return _profiler
+
+
+def isEnabled():
+    return _profiler.enabled
+
+
+def timed(name):
+    """Gives a context manager timing its block as the step name, or one
+    doing nothing if profiling is off."""
+    if not _profiler.enabled:
+        return _NULL_TIMER
+    return _Timer(_profiler, name)
+
+
+def count(name, n=1):
+    """Adds n to the counter name if profiling is on."""
+    if _profiler.enabled:
+        _profiler.count(name, n)
+
+
+def getPreferences():
+    """Gives (enabled, trace file) from the workbench preferences. An empty
+    trace file means no trace is written."""
+    param = FreeCAD.ParamGet(PARAMETER_GROUP)
+    return param.GetBool("Profile", False), param.GetString("ProfileTrace", "")
+
+
+@contextlib.contextmanager
+def session(name, enabled=None, trace=None):
+    """Profiles the with block and reports it when done. enabled and trace
+    default to the preferences (see getPreferences). Sessions inside a
+    session are part of the outer one."""
+    if _session_depth[0] > 0:
+        _session_depth[0] += 1
+        try:
+            yield _profiler
+        finally:
+            _session_depth[0] -= 1
+        return
+    pref_enabled, pref_trace = getPreferences()
+    if enabled is None:
+        enabled = pref_enabled
+    if trace is None:
+        trace = pref_trace
+    if not enabled:
+        yield _profiler
+        return
+    _profiler.reset()
+    _profiler.enabled = True
+    _profiler.tracing = bool(trace)
+    _session_depth[0] = 1
+    try:
+        with _Timer(_profiler, name):
+            yield _profiler
+    finally:
+        _session_depth[0] = 0
+        _profiler.enabled = False
+        elapsed = _clock() - _profiler.start
+        FreeCAD.Console.PrintMessage(_profiler.summary(name, elapsed))
+        if trace:
+            _profiler.writeTrace(os.path.expanduser(trace))
+            FreeCAD.Console.PrintMessage("Profile trace written to "
+                                         + trace + "\n")
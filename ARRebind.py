@@ -0,0 +1,378 @@
+import FreeCAD
+import Part
+import ARTools
+import ARFrames
+import heapq
+import json
+import os
+import numpy as np
+if FreeCAD.GuiUp:
+    import FreeCADGui
+    from PySide import QtGui
+
+__title__ = "ARRebind"
+__author__ = "Mathias Hauan Arbo"
+__workbenchname__ = "ARBench"
+__version__ = "0.1"
+__url__ = "https://github.com/mahaarbo/ARBench"
+__doc__ = """
+Re-binding of feature frames to a new revision of a part. The feature frames
+of a features json file (see ARTools.exportFeatureFrames and
+ARTools.exportAssembly) are matched to the subelements of the new shape by
+their primitive info, using a k-d tree over the subelement centers, and
+recreated in one batch. Centers are compared in world coordinates, like the
+primitive info is stored, so the new part should be placed where the old
+one was."""
+
+# Keys of the primitive info (see ARTools.getPrimitiveInfo) by primitive
+# type, used to tell the primitive type of frames exported without it
+PRIMITIVE_KEYS = {
+    "ArcOfCircle": ("radius", "center", "axis", "parameterrange"),
+    "Circle": ("radius", "center", "axis", "parameterrange"),
+    "ArcOfEllipse": ("center", "axis", "majorradius", "minorradius",
+                     "parameterrange"),
+    "Ellipse": ("center", "axis", "majorradius", "minorradius",
+                "parameterrange"),
+    "ArcOfHyperbola": ("anglexu", "axis", "center", "majorradius",
+                       "minorradius", "parameterrange"),
+    "Hyperbola": ("anglexu", "axis", "center", "majorradius", "minorradius",
+                  "parameterrange"),
+    "ArcOfParabola": ("anglexu", "axis", "center", "focal"),
+    "Parabola": ("anglexu", "axis", "center", "focal"),
+    "Line": ("startpoint", "endpoint"),
+    "Cylinder": ("axis", "radius", "center", "parameterrange"),
+    "Plane": ("axis", "position", "parameterrange"),
+    "Sphere": ("axis", "center", "radius", "parameterrange"),
+    "Toroid": ("axis", "center", "majorradius", "minorradius",
+               "parameterrange"),
+    "Cone": ("axis", "center", "radius", "semiangle", "parameterrange")}
+EDGE_TYPES = ["ArcOfCircle", "Circle", "ArcOfEllipse", "Ellipse",
+              "ArcOfHyperbola", "Hyperbola", "ArcOfParabola", "Parabola",
+              "Line"]
+# Primitive info sizes and the curve/surface attributes they come from
+SIZE_KEYS = [("radius", "Radius"),
+             ("majorradius", "MajorRadius"),
+             ("minorradius", "MinorRadius"),
+             ("focal", "Focal")]
+
+
+###################################################################
+# Spatial index
+###################################################################
+class KDTree(object):
+    """Static k-d tree over an N x 3 array of points for nearest neighbour
+    queries. scipy.spatial.cKDTree is used instead if scipy is installed."""
+    def __init__(self, points, leafsize=8):
+        self.points = np.asarray(points, dtype=np.float64).reshape((-1, 3))
+        self.leafsize = leafsize
+        self.ctree = None
+        try:
+            from scipy.spatial import cKDTree
+            self.ctree = cKDTree(self.points, leafsize=leafsize)
+            return
+        except ImportError:
+            pass
+        self.index = np.arange(len(self.points))
+        # (start, end, split axis or -1 for leaves, split, left, right)
+        self.nodes = []
+        self._build(0, len(self.points))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, start, end):
+        node = len(self.nodes)
+        self.nodes.append(None)
+        if end - start <= self.leafsize:
+            self.nodes[node] = (start, end, -1, 0.0, -1, -1)
+            return node
+        idx = self.index[start:end]
+        pts = self.points[idx]
+        axis = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = (end - start)//2
+        order = np.argpartition(pts[:, axis], mid)
+        self.index[start:end] = idx[order]
+        split = self.points[self.index[start + mid], axis]
+        left = self._build(start, start + mid)
+        right = self._build(start + mid, end)
+        self.nodes[node] = (start, end, axis, split, left, right)
+        return node
+
+    def query(self, point, k=1, distance_upper_bound=np.inf):
+        """Gives the distances and indices of the k nearest points within
+        distance_upper_bound, nearest first."""
+        k = min(k, len(self.points))
+        if k == 0:
+            return [], []
+        point = np.asarray(point, dtype=np.float64)
+        if self.ctree is not None:
+            dists, idx = self.ctree.query(point, k=k,
+                                          distance_upper_bound=distance_upper_bound)
+            dists = np.atleast_1d(dists)
+            idx = np.atleast_1d(idx)
+            found = np.isfinite(dists)
+            return dists[found].tolist(), idx[found].tolist()
+        # Max-heap of the best k as (-distance, index)
+        best = []
+        bound = distance_upper_bound
+        stack = [(0, 0.0)]
+        while stack:
+            node, mindist = stack.pop()
+            if mindist > bound:
+                continue
+            start, end, axis, split, left, right = self.nodes[node]
+            if axis < 0:
+                idx = self.index[start:end]
+                dists = np.sqrt(((self.points[idx] - point)**2).sum(axis=1))
+                for d, i in zip(dists.tolist(), idx.tolist()):
+                    if d > bound:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, i))
+                    else:
+                        heapq.heappushpop(best, (-d, i))
+                    if len(best) == k:
+                        bound = min(bound, -best[0][0])
+                continue
+            diff = point[axis] - split
+            if diff < 0:
+                near, far = left, right
+            else:
+                near, far = right, left
+            stack.append((far, max(mindist, abs(diff))))
+            stack.append((near, mindist))
+        best.sort(reverse=True)
+        return [-d for d, i in best], [i for d, i in best]
+
+
+###################################################################
+# Feature geometry
+###################################################################
+def guessPrimitiveTypes(frame_dict):
+    """Gives the primitive types a frame dictionary can be, from its
+    primitivetype or else from the keys of its primitive info."""
+    prim_type = frame_dict.get("primitivetype", "")
+    if prim_type != "":
+        if prim_type in PRIMITIVE_KEYS or prim_type == "Vertex":
+            return [prim_type]
+        return []
+    shape_type = frame_dict.get("shapetype", "")
+    if shape_type == "Vertex":
+        return ["Vertex"]
+    fits = [t for t, keys in PRIMITIVE_KEYS.items()
+            if (t in EDGE_TYPES) == (shape_type == "Edge")
+            and all(key in frame_dict for key in keys)]
+    if len(fits) == 0:
+        return []
+    most = max(len(PRIMITIVE_KEYS[t]) for t in fits)
+    return [t for t in fits if len(PRIMITIVE_KEYS[t]) == most]
+
+
+def infoGeometry(info):
+    """Gives the center in m, unit axis or None, and sizes in m of a
+    primitive info dictionary. The center is None if the info has no
+    position."""
+    axis = info.get("axis")
+    if "center" in info:
+        center = np.array(info["center"])
+    elif "position" in info:
+        center = np.array(info["position"])
+    elif "startpoint" in info and "endpoint" in info:
+        sp = np.array(info["startpoint"])
+        ep = np.array(info["endpoint"])
+        center = 0.5*(sp + ep)
+        axis = ep - sp
+    else:
+        center = None
+    if axis is not None:
+        axis = np.array(axis, dtype=np.float64)
+        norm = np.linalg.norm(axis)
+        axis = axis/norm if norm > 0 else None
+    sizes = tuple(info[key] for key, attr in SIZE_KEYS if key in info)
+    return center, axis, sizes
+
+
+def subObjectGeometry(subobj, prim_type, scale=1e-3):
+    """Gives the center, axis and sizes of a subelement like infoGeometry,
+    without computing the full primitive info."""
+    if prim_type == "Vertex":
+        return np.array(ARTools.vector2list(subobj.Point, scale)), None, ()
+    if subobj.ShapeType == "Edge":
+        geom = subobj.Curve
+    else:
+        geom = subobj.Surface
+    if prim_type == "Line":
+        sp = np.array(ARTools.vector2list(subobj.valueAt(subobj.FirstParameter), scale))
+        ep = np.array(ARTools.vector2list(subobj.valueAt(subobj.LastParameter), scale))
+        axis = ep - sp
+        norm = np.linalg.norm(axis)
+        return 0.5*(sp + ep), axis/norm if norm > 0 else None, ()
+    if hasattr(geom, "Center"):
+        center = np.array(ARTools.vector2list(geom.Center, scale))
+    else:
+        center = np.array(ARTools.vector2list(geom.Position, scale))
+    axis = None
+    if hasattr(geom, "Axis"):
+        axis = np.array(ARTools.vector2list(geom.Axis, scale=1))
+    sizes = tuple(scale*getattr(geom, attr) for key, attr in SIZE_KEYS
+                  if hasattr(geom, attr))
+    return center, axis, sizes
+
+
+class FeatureIndex(object):
+    """k-d trees over the subelement centers of a shape, one per primitive
+    type, built on first use."""
+    def __init__(self, shape):
+        self.shape = shape
+        self.indices, self.counts = ARTools.shapeCensus(shape)
+        self.trees = {}
+
+    def getTree(self, prim_type):
+        if prim_type not in self.trees:
+            names = []
+            centers = []
+            axes = []
+            sizes = []
+            for shape_type in ("Face", "Edge", "Vertex"):
+                for i in self.indices[shape_type].get(prim_type, []):
+                    name = shape_type + str(i)
+                    center, axis, size = subObjectGeometry(
+                        self.shape.getElement(name), prim_type)
+                    names.append(name)
+                    centers.append(center)
+                    axes.append(axis)
+                    sizes.append(size)
+            self.trees[prim_type] = (KDTree(centers), names, axes, sizes)
+        return self.trees[prim_type]
+
+    def match(self, prim_types, center, axis, sizes, tol, axis_tol, size_tol,
+              k=8):
+        """Gives (distance, subelement name, primitive type, center) of the
+        nearest subelement of one of prim_types within tol of center with the same
+        axis and sizes, or None."""
+        best = None
+        for prim_type in prim_types:
+            tree, names, axes, cand_sizes = self.getTree(prim_type)
+            dists, idx = tree.query(center, k=k, distance_upper_bound=tol)
+            for d, i in zip(dists, idx):
+                if best is not None and d >= best[0]:
+                    break
+                if (axis is not None and axes[i] is not None
+                        and 1.0 - abs(np.dot(axis, axes[i])) > axis_tol):
+                    continue
+                if (len(sizes) == len(cand_sizes[i]) and len(sizes) > 0
+                        and max(abs(a - b) for a, b in
+                                zip(sizes, cand_sizes[i])) > size_tol):
+                    continue
+                best = (d, names[i], prim_type, tree.points[i])
+                break
+        return best
+
+
+###################################################################
+# Module functions
+###################################################################
+def loadFeatureDicts(ifile):
+    """Gives the feature frame dictionaries of a features json file, in the
+    exportFeatureFrames layout or the exportAssembly layout."""
+    with open(ifile, "r") as featfile:
+        data = json.load(featfile)
+    if "parts" in data:
+        features = []
+        for partprops in data["parts"].values():
+            features.extend(partprops.get("features", {}).values())
+        return features
+    return list(data.get("features", {}).values())
+
+
+def rebindFeatureFrames(features, parts, tol=5e-3, axis_tol=1e-3,
+                        size_tol=1e-5):
+    """Recreates feature frames from their dictionaries (see
+    loadFeatureDicts) on the matching subelements of new parts.
+    parts is a dictionary from the part label stored with the frames to the
+    new part, or a single part that all frames are bound to. A subelement
+    matches if its center is within tol m of the stored center, its axis
+    within axis_tol (1 - |cos|) and its sizes within size_tol m. The feature
+    placement is moved by the difference of the centers, the offset and
+    label are kept. Returns (frames, labels of unmatched frames)."""
+    indexes = {}
+    specs = []
+    unmatched = []
+    for d in features:
+        if isinstance(parts, dict):
+            part = parts.get(d.get("part"))
+        else:
+            part = parts
+        prim_types = guessPrimitiveTypes(d)
+        if part is None or len(prim_types) == 0:
+            unmatched.append(d["label"])
+            continue
+        if part.Name not in indexes:
+            indexes[part.Name] = FeatureIndex(part.Shape)
+        old_ffpl = ARTools.axisvec2placement(d["featureplacement"])
+        center, axis, sizes = infoGeometry(d)
+        if center is None:
+            # No primitive info, the feature frame marks the feature
+            abs_ffpl = part.Placement.multiply(old_ffpl)
+            center = np.array(ARTools.vector2list(abs_ffpl.Base))
+        found = indexes[part.Name].match(prim_types, center, axis, sizes,
+                                         tol, axis_tol, size_tol)
+        if found is None:
+            unmatched.append(d["label"])
+            continue
+        dist, name, prim_type, new_center = found
+        subobj = part.Shape.getElement(name)
+        shift = FreeCAD.Vector(*((new_center - center)*1e3).tolist())
+        # The centers are in world coordinates, the feature placement is
+        # relative to the part
+        shift = part.Placement.Rotation.inverted().multVec(shift)
+        new_ffpl = FreeCAD.Placement(old_ffpl.Base + shift,
+                                     old_ffpl.Rotation)
+        properties = {"Label": d["label"],
+                      "Placement": ARTools.axisvec2placement(d["placement"]),
+                      "PrimitiveType": prim_type,
+                      "ShapeType": subobj.ShapeType,
+                      "Positioning": d.get("positioning", ""),
+                      "SubElement": name}
+        ad = ARTools.getPrimitiveInfo(prim_type, subobj)
+        specs.append((part, new_ffpl, properties, ad))
+    frames = ARFrames.makeFeatureFrames(specs)
+    FreeCAD.Console.PrintMessage("Rebound {0} of {1} feature frames\n".format(
+        len(frames), len(features)))
+    if len(unmatched) > 0:
+        FreeCAD.Console.PrintWarning("No match for feature frames: "
+                                     + ", ".join(unmatched) + "\n")
+    return frames, unmatched
+
+
+def rebindFeatureFramesFromFile(ifile, part=None, doc=None, **kwargs):
+    """Recreates the feature frames of a features json file on part, or on
+    the parts of doc (by default the active document) with the labels
+    stored with the frames. See rebindFeatureFrames for the tolerances."""
+    features = loadFeatureDicts(ifile)
+    if part is None:
+        if doc is None:
+            doc = FreeCAD.ActiveDocument
+        part = dict((str(p.Label), p) for p in ARTools.getDocumentParts(doc))
+    return rebindFeatureFrames(features, part, **kwargs)
+
+
+def rebindFeatureFramesDialogue():
+    """Spawns a dialogue window for re-binding the feature frames of a
+    features json file to the selected part, or to the parts of the
+    document with the same labels if none is selected."""
+    s = [item for item in FreeCADGui.Selection.getSelection()
+         if isinstance(item, Part.Feature)]
+    if len(s) > 1:
+        FreeCAD.Console.PrintError("Select one part or none.\n")
+        return False
+    textprompt = "Open the feature frames to re-bind"
+    ifile, filt = QtGui.QFileDialog.getOpenFileName(None, textprompt,
+                                                    os.getenv("HOME"),
+                                                    "*.json")
+    if ifile == "":
+        # User cancelled
+        return False
+    part = s[0] if len(s) == 1 else None
+    rebindFeatureFramesFromFile(ifile, part)
+    return True
@@ -1,7 +1,12 @@
 import FreeCAD
 import Part
+import ARCache
+import ARProfiler
+import errno
 import json  # For exporting part infos
 import os    # for safer path handling
+import tempfile
+import time
 if FreeCAD.GuiUp:
     import FreeCADGui
     from PySide import QtGui
@@ -40,6 +45,16 @@ def placement2axisvec(pl, scale=1e-3):
                          "angle": pl.Rotation.Angle}}
 
 
+def axisvec2placement(axisvec, scale=1e-3):
+    """Gives the placement of an axisvec dictionary, the inverse of
+    placement2axisvec."""
+    import math
+    origin = FreeCAD.Vector(*axisvec["origin"])*(1.0/scale)
+    rotation = FreeCAD.Rotation(FreeCAD.Vector(*axisvec["rotation"]["axis"]),
+                                math.degrees(axisvec["rotation"]["angle"]))
+    return FreeCAD.Placement(origin, rotation)
+
+
 def boundingBox2list(bb, scale=1e-3):
     """Gives the bounding box as a list in m instead of mm"""
     return [bb.XMin*scale, bb.XMax*scale,
@@ -48,76 +63,174 @@ def boundingBox2list(bb, scale=1e-3):
 
 
 def principalProperties2dict(pp, scale=1e-3):
+    """Gives the principal properties with lower case keys, with all the
+    vectors converted in one pass (see vectors2array)."""
     npp = {}
-    for key, value in pp.iteritems():
+    vec_keys = []
+    for key, value in pp.items():
         if type(value) is FreeCAD.Vector:
-            npp[key.lower()] = vector2list(value, scale=1e-3)
+            vec_keys.append(key)
         else:
             npp[key.lower()] = value
+    vecs = vectors2array([pp[key] for key in vec_keys], scale).tolist()
+    for key, vec in zip(vec_keys, vecs):
+        npp[key.lower()] = vec
     return npp
 
 
+###################################################################
+# Batch conversion functions
+###################################################################
+def vectors2array(vecs, scale=1e-3):
+    """Gives the vectors as an N x 3 array, set scale for scaling factor."""
+    import numpy as np
+    arr = np.array([(v.x, v.y, v.z) for v in vecs], dtype=np.float64)
+    return arr.reshape((-1, 3))*scale
+
+
+def placements2arrays(pls, scale=1e-3):
+    """Gives the placements as an N x 3 array of origins and an N x 4 array
+    of quaternions (x, y, z, w)."""
+    import numpy as np
+    raw = np.array([(pl.Base.x, pl.Base.y, pl.Base.z) + tuple(pl.Rotation.Q)
+                    for pl in pls], dtype=np.float64).reshape((-1, 7))
+    return raw[:, :3]*scale, raw[:, 3:]
+
+
+def quaternions2matrices(quats):
+    """Gives the N x 4 quaternions (x, y, z, w) as N x 3 x 3 rotation
+    matrices."""
+    import numpy as np
+    q = quats/np.linalg.norm(quats, axis=1)[:, None]
+    x, y, z, w = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    mats = np.empty((len(q), 3, 3), dtype=np.float64)
+    mats[:, 0, 0] = 1 - 2*(y*y + z*z)
+    mats[:, 0, 1] = 2*(x*y - z*w)
+    mats[:, 0, 2] = 2*(x*z + y*w)
+    mats[:, 1, 0] = 2*(x*y + z*w)
+    mats[:, 1, 1] = 1 - 2*(x*x + z*z)
+    mats[:, 1, 2] = 2*(y*z - x*w)
+    mats[:, 2, 0] = 2*(x*z - y*w)
+    mats[:, 2, 1] = 2*(y*z + x*w)
+    mats[:, 2, 2] = 1 - 2*(x*x + y*y)
+    return mats
+
+
+def quaternions2axisangles(quats):
+    """Gives the N x 4 quaternions (x, y, z, w) as an N x 3 array of axes
+    and N angles, with the same conventions as FreeCAD.Rotation."""
+    import numpy as np
+    angles = 2*np.arccos(np.clip(quats[:, 3], -1.0, 1.0))
+    norms = np.linalg.norm(quats[:, :3], axis=1)
+    axes = np.zeros((len(quats), 3), dtype=np.float64)
+    axes[:, 2] = 1.0
+    nonzero = norms >= np.finfo(np.float32).eps
+    axes[nonzero] = quats[nonzero, :3]/norms[nonzero, None]
+    return axes, angles
+
+
+def placements2matrices(pls, scale=1e-3):
+    """Gives the placements as N x 4 x 4 transformation matrices, set scale 1
+    to get in mm."""
+    import numpy as np
+    origins, quats = placements2arrays(pls, scale)
+    mats = np.zeros((len(origins), 4, 4), dtype=np.float64)
+    mats[:, :3, :3] = quaternions2matrices(quats)
+    mats[:, :3, 3] = origins
+    mats[:, 3, 3] = 1.0
+    return mats
+
+
+def placements2axisvecs(pls, scale=1e-3):
+    """Gives the placements as a list of dictionaries, the same as
+    placement2axisvec but converted in one pass."""
+    origins, quats = placements2arrays(pls, scale)
+    axes, angles = quaternions2axisangles(quats)
+    return [{"origin": o, "rotation": {"axis": a, "angle": ang}}
+            for o, a, ang in zip(origins.tolist(), axes.tolist(),
+                                 angles.tolist())]
+
+
+def boundingBoxes2array(bbs, scale=1e-3):
+    """Gives the bounding boxes as an N x 6 array of
+    [xmin, xmax, ymin, ymax, zmin, zmax]."""
+    import numpy as np
+    arr = np.array([(bb.XMin, bb.XMax, bb.YMin, bb.YMax, bb.ZMin, bb.ZMax)
+                    for bb in bbs], dtype=np.float64)
+    return arr.reshape((-1, 6))*scale
+
+
+# Primitive types in the order they are tested, subclasses before bases
+EDGE_PRIMITIVES = ["Arc", "ArcOfCircle", "ArcOfEllipse", "ArcOfHyperbola",
+                   "ArcOfParabola", "BSplineCurve", "BezierCurve", "Circle",
+                   "Ellipse", "Hyperbola", "Line", "Parabola"]
+FACE_PRIMITIVES = ["BSplineSurface", "BezierSurface", "Cylinder", "Plane",
+                   "Sphere", "Toroid", "Cone"]
+# Names of ShapeTypes that differ from the OCCT ones
+SHAPE_TYPE_NAMES = {"CompSolid": "Compsolid"}
+# Geometry class to primitive type, filled on first sight of each class
+_curve_dispatch = {}
+_surface_dispatch = {}
+
+
+def _classifyGeometry(geom, primitives, dispatch):
+    """Gives the primitive type of a curve or surface. Each class is only
+    resolved against the Part classes once, later lookups are by type."""
+    cls = type(geom)
+    prim_type = dispatch.get(cls)
+    if prim_type is None:
+        prim_type = "Unknown"
+        for name in primitives:
+            part_cls = getattr(Part, name, None)
+            if part_cls is not None and isinstance(geom, part_cls):
+                prim_type = name
+                break
+        dispatch[cls] = prim_type
+    return prim_type
+
+
+def classifyCurve(curve):
+    """Gives the primitive type of a curve, "Unknown" if not recognized."""
+    return _classifyGeometry(curve, EDGE_PRIMITIVES, _curve_dispatch)
+
+
+def classifySurface(surface):
+    """Gives the primitive type of a surface, "Unknown" if not
+    recognized."""
+    return _classifyGeometry(surface, FACE_PRIMITIVES, _surface_dispatch)
+
+
 def describeSubObject(subobj):
-    """Returns PrimitiveType, ShapeType."""
-    if isinstance(subobj, Part.Vertex):
-        return "Vertex", "Vertex"
-    elif isinstance(subobj, Part.Edge):
-        if isinstance(subobj.Curve, Part.Arc):
-            return "Arc", "Edge"
-        elif isinstance(subobj.Curve, Part.ArcOfCircle):
-            return "ArcOfCircle", "Edge"
-        elif isinstance(subobj.Curve, Part.ArcOfEllipse):
-            return "ArcOfEllipse", "Edge"
-        elif isinstance(subobj.Curve, Part.ArcOfHyperbola):
-            return "ArcOfHyperbola", "Edge"
-        elif isinstance(subobj.Curve, Part.ArcOfParabola):
-            return "ArcOfParabola", "Edge"
-        elif isinstance(subobj.Curve, Part.BSplineCurve):
-            return "BSplineCurve", "Edge"
-        elif isinstance(subobj.Curve, Part.BezierCurve):
-            return "BezierCurve", "Edge"
-        elif isinstance(subobj.Curve, Part.Circle):
-            return "Circle", "Edge"
-        elif isinstance(subobj.Curve, Part.Ellipse):
-            return "Ellipse", "Edge"
-        elif isinstance(subobj.Curve, Part.Hyperbola):
-            return "Hyperbola", "Edge"
-        elif isinstance(subobj.Curve, Part.Line):
-            return "Line", "Edge"
-        elif isinstance(subobj.Curve, Part.Parabola):
-            return "Parabola", "Edge"
-        else:
-            FreeCAD.Console.PrintError("Unknown edge type")
-    elif isinstance(subobj, Part.Face):
-        if isinstance(subobj.Surface, Part.BSplineSurface):
-            return "BSplineSurface", "Face"
-        elif isinstance(subobj.Surface, Part.BezierSurface):
-            return "BezierSurface", "Face"
-        elif isinstance(subobj.Surface, Part.Cylinder):
-            return "Cylinder", "Face"
-        elif isinstance(subobj.Surface, Part.Plane):
-            return "Plane", "Face"
-        elif isinstance(subobj.Surface, Part.Sphere):
-            return "Sphere", "Face"
-        elif isinstance(subobj.Surface, Part.Toroid):
-            return "Toroid", "Face"
-        elif isinstance(subobj.Surface, Part.Cone):
-            return "Cone", "Face"
-        else:
-            FreeCAD.Console.PrintError("Unknown surface type")
-    # Better strategy desirable for the following:
-    elif isinstance(subobj, Part.Wire):
-        return "Wire", "Wire"
-    elif isinstance(subobj, Part.Shell):
-        return "Shell", "Shell"
-    elif isinstance(subobj, Part.Solid):
-        return "Solid", "Solid"
-    elif isinstance(subobj, Part.Compsolid):
-        return "Compsolid", "Compsolid"
-    elif isinstance(subobj, Part.Compound):
-        return "Compound", "Compound"
-    else:
-        FreeCAD.Console.PrintError("Unable to identify subobject.")
+    """Returns PrimitiveType, ShapeType.
+    PrimitiveType is "Unknown" for unrecognized curves and surfaces."""
+    shape_type = subobj.ShapeType
+    if shape_type == "Edge":
+        return classifyCurve(subobj.Curve), "Edge"
+    elif shape_type == "Face":
+        return classifySurface(subobj.Surface), "Face"
+    shape_type = SHAPE_TYPE_NAMES.get(shape_type, shape_type)
+    return shape_type, shape_type
+
+
+def shapeCensus(shape):
+    """Classifies every face, edge and vertex of a shape in one pass.
+    Returns (indices, counts), where indices[ShapeType][PrimitiveType] is the
+    list of subelement indices, counting from 1 as in "Face1", and
+    counts[ShapeType][PrimitiveType] is the length of that list."""
+    indices = {"Face": {}, "Edge": {}, "Vertex": {}}
+    for i, face in enumerate(shape.Faces):
+        prim_type = classifySurface(face.Surface)
+        indices["Face"].setdefault(prim_type, []).append(i + 1)
+    for i, edge in enumerate(shape.Edges):
+        prim_type = classifyCurve(edge.Curve)
+        indices["Edge"].setdefault(prim_type, []).append(i + 1)
+    nvertexes = len(shape.Vertexes)
+    if nvertexes > 0:
+        indices["Vertex"]["Vertex"] = list(range(1, nvertexes + 1))
+    counts = {}
+    for shape_type, by_prim in indices.items():
+        counts[shape_type] = {k: len(v) for k, v in by_prim.items()}
+    return indices, counts
 
 
 def closeToZero(a, tol=1e-10):
@@ -132,6 +245,8 @@ def spawnClassCommand(classname, function, resources):
     spawnClassCommand("testcommand", testfunc,
     {"Pixmap":"", "MenuText":"menutext","ToolTip":"tooltiptext"})
     then add "testcommand" to commandlist in InitGui.py
+    Commands of the workbench itself are listed in ARCommands instead, so
+    that their modules are loaded lazily.
     """
     def Activated(s):
         function()
@@ -143,25 +258,314 @@ def spawnClassCommand(classname, function, resources):
     FreeCADGui.addCommand(classname, CommandClass())
 
 
-def getLocalPartProps(obj):
-    old_placement = obj.Placement
-    obj.Placement = FreeCAD.Placement()
+def getLocalShape(obj):
+    """Gives the shape of the part in the part's own frame.
+    obj.Shape hands out a new shape sharing the underlying geometry, so
+    resetting its placement neither copies geometry nor touches obj."""
+    shape = obj.Shape
+    shape.Placement = FreeCAD.Placement()
+    return shape
+
+
+def getShapeProps(shape):
+    """Gives the bounding box, volume, center of mass and principal
+    properties of a shape."""
+    with ARProfiler.timed("getShapeProps"):
+        return {
+            "boundingbox": boundingBoxes2array([shape.BoundBox])[0].tolist(),
+            "volume": shape.Volume*1e-9,
+            "centerofmass": vectors2array([shape.CenterOfMass])[0].tolist(),
+            "principalproperties": principalProperties2dict(shape.PrincipalProperties)
+        }
+
+
+def getLocalPartProps(obj, use_cache=True, axisvec=None, collision=None):
+    """Gives the part properties in the part's own frame, and the part's
+    placement. The part itself is left untouched.
+    The shape properties are looked up in the shape cache (see ARCache) so
+    unchanged parts are not integrated again. axisvec is the part's
+    placement if already converted (see placements2axisvecs).
+    If collision is set, the collision geometry (see getCollisionProps) is
+    included. It defaults to the ExportCollision preference."""
+    ARProfiler.count("parts")
+    if axisvec is None:
+        axisvec = placements2axisvecs([obj.Placement])[0]
+    if collision is None:
+        param = FreeCAD.ParamGet(ARProfiler.PARAMETER_GROUP)
+        collision = param.GetBool("ExportCollision", False)
+    with ARProfiler.timed("getLocalPartProps"):
+        shape = getLocalShape(obj)
+        if use_cache:
+            cache = ARCache.getShapeCache()
+            key = cache.key(shape)
+            shapeprops = cache.lookup(shape, getShapeProps, key)
+            if collision:
+                ckey = key + "_collision" + str(COLLISION_TOLERANCE)
+                shapeprops = dict(shapeprops)
+                shapeprops.update(cache.lookup(shape, getCollisionProps,
+                                               ckey))
+        else:
+            shapeprops = getShapeProps(shape)
+            if collision:
+                shapeprops.update(getCollisionProps(shape))
     # Part properties
     partprops = {
         "label": obj.Label,
-        "placement": placement2axisvec(old_placement),
-        "boundingbox": boundingBox2list(obj.Shape.BoundBox),
-        "volume": obj.Shape.Volume*1e-9,
-        "centerofmass": vector2list(obj.Shape.CenterOfMass),
-        "principalproperties": principalProperties2dict(obj.Shape.PrincipalProperties)
+        "placement": axisvec,
     }
-    obj.Placement = old_placement
+    partprops.update(shapeprops)
     return partprops
 
 
+def getFeatureFrameMap(doc):
+    """Gives a dictionary from part name to the feature frames attached to
+    the part. The document is only scanned once, so use this instead of
+    looking through the InList of every part when exporting many parts."""
+    import ARFrames
+    ff_map = {}
+    for obj in doc.Objects:
+        if isinstance(getattr(obj, "Proxy", None), ARFrames.FeatureFrame):
+            ff_map.setdefault(obj.Part.Name, []).append(obj)
+    return ff_map
+
+
+def getFeatureFrames(obj, ff_map=None):
+    """Gives the feature frames attached to a part, either looked up in
+    ff_map (see getFeatureFrameMap) or found in the part's InList."""
+    if ff_map is not None:
+        return ff_map.get(obj.Name, [])
+    import ARFrames
+    ff_check = lambda x: isinstance(getattr(x, "Proxy", None),
+                                    ARFrames.FeatureFrame)
+    return [x for x in obj.InList if ff_check(x)]
+
+
+def getFrameDicts(frames):
+    """Gives the dictionaries (see Frame.getDict) of the frames, with all
+    placements converted in one pass."""
+    import ARFrames
+    ARProfiler.count("frames", len(frames))
+    with ARProfiler.timed("getFrameDicts"):
+        axisvecs = [{"placement": av} for av in
+                    placements2axisvecs([f.Placement for f in frames])]
+        ffs = [i for i, f in enumerate(frames)
+               if isinstance(f.Proxy, ARFrames.FeatureFrame)]
+        ffpls = placements2axisvecs([frames[i].FeaturePlacement for i in ffs])
+        for i, av in zip(ffs, ffpls):
+            axisvecs[i]["featureplacement"] = av
+        return [f.Proxy.getDict(av) for f, av in zip(frames, axisvecs)]
+
+
+def getFeatureFramesDict(obj, ff_map=None):
+    """Gives the feature frames attached to a part as a dictionary by
+    label."""
+    ff_list = getFeatureFrames(obj, ff_map)
+    return {ff.Label: d for ff, d in zip(ff_list, getFrameDicts(ff_list))}
+
+
+def getAssemblyDict(parts, ff_map=None):
+    """Gives the part info and feature frames of all the parts.
+    The part-to-frames map is built once for the whole document if it is
+    not given."""
+    if ff_map is None and len(parts) > 0:
+        ff_map = getFeatureFrameMap(parts[0].Document)
+    parts_dict = {}
+    axisvecs = placements2axisvecs([obj.Placement for obj in parts])
+    for obj, axisvec in zip(parts, axisvecs):
+        partprops = getLocalPartProps(obj, axisvec=axisvec)
+        partprops["features"] = getFeatureFramesDict(obj, ff_map)
+        parts_dict[obj.Label] = partprops
+    return {"parts": parts_dict}
+
+
+def iterPartRecords(parts, ff_map=None, features=True):
+    """Yields the records of one part at a time, see iterAssemblyRecords.
+    The part placements are converted in one pass up front."""
+    if features and ff_map is None and len(parts) > 0:
+        ff_map = getFeatureFrameMap(parts[0].Document)
+    axisvecs = placements2axisvecs([obj.Placement for obj in parts])
+    for obj, axisvec in zip(parts, axisvecs):
+        record = {"type": "part"}
+        record.update(getLocalPartProps(obj, axisvec=axisvec))
+        records = [record]
+        if features:
+            ff_list = getFeatureFrames(obj, ff_map)
+            for ff_dict in getFrameDicts(ff_list):
+                record = {"type": "feature"}
+                record.update(ff_dict)
+                records.append(record)
+        yield records
+
+
+def iterAssemblyRecords(parts, ff_map=None, features=True):
+    """Yields one record per part, followed by one record per feature frame
+    of that part if features is set. Records are marked by "type", "part"
+    or "feature", and feature records name their part under "part"."""
+    for records in iterPartRecords(parts, ff_map, features):
+        for record in records:
+            yield record
+
+
+def getDocumentParts(doc):
+    """Gives all the parts in a document."""
+    return [obj for obj in doc.Objects if isinstance(obj, Part.Feature)]
+
+
+def getDocumentFrames(doc, parts=None):
+    """Gives all the frames in a document, or only the ones attached to
+    parts if given."""
+    import ARFrames
+    names = None
+    if parts is not None:
+        names = set(p.Name for p in parts)
+    frames = []
+    for obj in doc.Objects:
+        proxy = getattr(obj, "Proxy", None)
+        if not isinstance(proxy, ARFrames.Frame):
+            continue
+        if names is not None:
+            if not isinstance(proxy, ARFrames.PartFrame):
+                continue
+            if obj.Part.Name not in names:
+                continue
+        frames.append(obj)
+    return frames
+
+
+def getFrameTransform(frame):
+    """Gives the placement of a frame relative to its part, or relative to
+    the world frame for freestanding frames."""
+    import ARFrames
+    if isinstance(frame.Proxy, ARFrames.FeatureFrame):
+        return frame.FeaturePlacement.multiply(frame.Placement)
+    return frame.Placement
+
+
 ###################################################################
 # Export functions
 ###################################################################
+def jsonFilePath(ofile):
+    """Gives ofile with a .json extension, creating its directory if
+    needed."""
+    odir, of = os.path.split(ofile)
+    if odir != "" and not os.path.exists(odir):
+        os.makedirs(odir)
+    if not of.lower().endswith(".json"):
+        ofile = ofile + ".json"
+    return ofile
+
+
+class FileLock(object):
+    """Lock on a file shared between processes, held by creating
+    <path>.lock exclusively. Locks older than timeout are considered stale
+    and are broken, so holders of the lock for longer than that must call
+    refresh regularly."""
+    def __init__(self, path, timeout=30.0, poll=0.05):
+        self.lockpath = path + ".lock"
+        self.timeout = timeout
+        self.poll = poll
+
+    def __enter__(self):
+        with ARProfiler.timed("FileLock wait"):
+            return self._acquire()
+
+    def _acquire(self):
+        t0 = time.time()
+        while True:
+            try:
+                fd = os.open(self.lockpath,
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return self
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            try:
+                stale = time.time() - os.path.getmtime(self.lockpath)
+            except OSError:
+                # Released in the meantime
+                continue
+            if stale > self.timeout:
+                try:
+                    os.remove(self.lockpath)
+                except OSError:
+                    pass
+            elif time.time() - t0 > self.timeout:
+                raise IOError("Timed out waiting for " + self.lockpath)
+            else:
+                time.sleep(self.poll)
+
+    def refresh(self):
+        """Marks the lock as still held, see timeout."""
+        try:
+            os.utime(self.lockpath, None)
+        except OSError:
+            pass
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            os.remove(self.lockpath)
+        except OSError:
+            pass
+
+
+def writeJSON(data, ofile):
+    """Writes data to ofile in a single write to a temporary file in the
+    same directory, which then replaces ofile. Readers never see a half
+    written file."""
+    with ARProfiler.timed("json encode"):
+        text = json.dumps(data, indent=1, separators=(',', ': '))
+    odir = os.path.dirname(os.path.abspath(ofile))
+    fd, tmpfile = tempfile.mkstemp(dir=odir, suffix=".tmp")
+    try:
+        with ARProfiler.timed("file write"):
+            with os.fdopen(fd, "w") as propfile:
+                propfile.write(text)
+            # mkstemp creates private files, give the usual permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmpfile, 0o666 & ~umask)
+            if hasattr(os, "replace"):
+                os.replace(tmpfile, ofile)
+            else:
+                if os.name == "nt" and os.path.exists(ofile):
+                    os.remove(ofile)
+                os.rename(tmpfile, ofile)
+    except Exception:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+        raise
+    return True
+
+
+def exportPartInfoAndFeatures(obj, ofile, partinfo=True, features=True,
+                              append=False):
+    """Exports part info and/or feature frames attached to a part.
+    The document is built in memory, merged with the content of ofile if
+    append is set, and written once. Other exporters of the same file are
+    held off by a FileLock while merging."""
+    ofile = jsonFilePath(ofile)
+    new_props = {}
+    if partinfo:
+        new_props.update(getLocalPartProps(obj))
+    if features:
+        feature_dict = getFeatureFramesDict(obj)
+    with FileLock(ofile):
+        partprops = {}
+        if append and os.path.exists(ofile):
+            with ARProfiler.timed("json read"):
+                with open(ofile, "r") as propfile:
+                    partprops = json.load(propfile)
+        partprops.update(new_props)
+        if features:
+            if "features" not in partprops.keys():
+                partprops["features"] = feature_dict
+            else:
+                partprops["features"].update(feature_dict)
+        writeJSON(partprops, ofile)
+    return True
+
+
 def exportPartInfo(obj, ofile):
     """
     Exports part info to a new json file.
@@ -171,17 +575,7 @@ def exportPartInfo(obj, ofile):
     For more information on principal properties, see TopoShape in OCCT
     documentation.
     """
-    # File path stuff
-    odir, of = os.path.split(ofile)
-    if not os.path.exists(odir):
-        os.makedirs(odir)
-    if not of.lower().endswith(".json"):
-        ofile = ofile + ".json"
-
-    partprops = getLocalPartProps(obj)
-    with open(ofile, "wb") as propfile:
-        json.dump(partprops, propfile, indent=1, separators=(',', ': '))
-    return True
+    return exportPartInfoAndFeatures(obj, ofile, features=False)
 
 
 def appendPartInfo(obj, ofile):
@@ -192,52 +586,97 @@ def appendPartInfo(obj, ofile):
     For more information on principal properties, see TopoShape in OCCT
     documentation.
     """
-    with open(ofile, "rb") as propfile:
-        partprops = json.load(propfile)
-    new_props = getLocalPartProps(obj)
-    partprops.update(new_props)
-    with open(ofile, "wb") as propfile:
-        json.dump(partprops, propfile, indent=1, separators=(',', ': '))
-    return True
+    return exportPartInfoAndFeatures(obj, ofile, features=False, append=True)
 
 
 def exportFeatureFrames(obj, ofile):
     """Exports feature frames attached to a part."""
-    # Get the feature frames
-    import ARFrames
-    ff_check = lambda x: isinstance(x.Proxy, ARFrames.FeatureFrame)
-    ff_list = filter(ff_check, obj.InList)
-    ff_named = {ff.Label: ff.Proxy.getDict() for ff in ff_list}
-    feature_dict = {"features": ff_named}
-
-    # File stuff
-    odir, of = os.path.split(ofile)
-    if not os.path.exists(odir):
-        os.makedirs(odir)
-    if not of.lower().endswith(".json"):
-        ofile = ofile + ".json"
-    with open(ofile, "wb") as propfile:
-        json.dump(feature_dict, propfile, indent=1, separators=(',', ': '))
-    return True
+    return exportPartInfoAndFeatures(obj, ofile, partinfo=False)
 
 
 def appendFeatureFrames(obj, ofile):
     """Rewrites/appends featureframes attached to a part to an existing json
     file."""
-    # Get the feature frames
+    return exportPartInfoAndFeatures(obj, ofile, partinfo=False, append=True)
+
+
+def exportAssembly(parts, ofile):
+    """Exports part info and feature frames of all the parts to a single new
+    json file. The parts are stored by label under "parts"."""
+    assembly_dict = getAssemblyDict(parts)
+    ofile = jsonFilePath(ofile)
+    with FileLock(ofile):
+        writeJSON(assembly_dict, ofile)
+    return True
+
+
+def exportAssemblyJSONL(parts, ofile, features=True):
+    """Streams part info and feature frames of all the parts to a JSON Lines
+    file, one record per line (see iterAssemblyRecords). Each part is
+    flushed as soon as it is done so the file can be consumed while the
+    export is running, and memory use does not grow with the assembly."""
+    odir = os.path.dirname(ofile)
+    if odir != "" and not os.path.exists(odir):
+        os.makedirs(odir)
+    if not ofile.lower().endswith(".jsonl"):
+        ofile = ofile + ".jsonl"
+    with FileLock(ofile) as lock:
+        with open(ofile, "w") as recfile:
+            for records in iterPartRecords(parts, features=features):
+                for record in records:
+                    with ARProfiler.timed("json encode"):
+                        line = json.dumps(record) + "\n"
+                    recfile.write(line)
+                with ARProfiler.timed("file write"):
+                    recfile.flush()
+                # The export can outlast the lock timeout
+                lock.refresh()
+    return True
+
+
+def exportFrameTransforms(frames, ofile, scale=1e-3):
+    """Exports the transforms of the frames (see getFrameTransform) as one
+    contiguous N x 4 x 4 float64 array, with a label, kind and part index
+    per frame. Part index -1 marks freestanding frames.
+    A .npz file stores everything as arrays. Any other extension gives a
+    raw little-endian float64 buffer that can be memory mapped, and a
+    <ofile>.json sidecar with the shape and the per-frame tables."""
+    import numpy as np
     import ARFrames
-    with open(ofile, "rb") as propfile:
-        partprops = json.load(propfile)
-    ff_check = lambda x: isinstance(x.Proxy, ARFrames.FeatureFrame)
-    ff_list = filter(ff_check, obj.InList)
-    ff_named = {ff.Label: ff.Proxy.getDict() for ff in ff_list}
-    feature_dict = {"features": ff_named}
-    if "features" not in partprops.keys():
-        partprops.update(feature_dict)
+    transforms = placements2matrices([getFrameTransform(f) for f in frames],
+                                     scale)
+    labels = [str(f.Label) for f in frames]
+    kinds = [type(f.Proxy).__name__ for f in frames]
+    partlabels = []
+    partindices = {}
+    partindex = []
+    for f in frames:
+        if isinstance(f.Proxy, ARFrames.PartFrame):
+            plabel = str(f.Part.Label)
+            if plabel not in partindices:
+                partindices[plabel] = len(partlabels)
+                partlabels.append(plabel)
+            partindex.append(partindices[plabel])
+        else:
+            partindex.append(-1)
+    odir = os.path.dirname(ofile)
+    if odir != "" and not os.path.exists(odir):
+        os.makedirs(odir)
+    if ofile.lower().endswith(".npz"):
+        np.savez(ofile,
+                 transforms=transforms,
+                 labels=np.array(labels),
+                 kinds=np.array(kinds),
+                 partindex=np.array(partindex, dtype=np.int64),
+                 parts=np.array(partlabels))
     else:
-        partprops["features"].update(feature_dict["features"])
-    with open(ofile, "wb") as propfile:
-        json.dump(partprops, propfile, indent=1, separators=(',', ': '))
+        transforms.astype("<f8").tofile(ofile)
+        writeJSON({"dtype": "<f8",
+                   "shape": list(transforms.shape),
+                   "labels": labels,
+                   "kinds": kinds,
+                   "partindex": partindex,
+                   "parts": partlabels}, ofile + ".json")
     return True
 
 
@@ -283,13 +722,14 @@ def exportPartInfoDialogue():
             return False
     else:
         NEWFILE = True
-    if NEWFILE:
-        exportPartInfo(unique_selected[0], ofile)
-    else:
-        appendPartInfo(unique_selected[0], ofile)
+    with ARProfiler.session("Export part info"):
+        if NEWFILE:
+            exportPartInfo(unique_selected[0], ofile)
+        else:
+            appendPartInfo(unique_selected[0], ofile)
 
     if len(unique_selected) > 1:
-        FreeCAD.Console.PrintWarning("Multi-part export not yet supported\n")
+        FreeCAD.Console.PrintWarning("Multi-part export not supported, use the assembly export\n")
     FreeCAD.Console.PrintMessage("Properties exported to "+str(ofile)+"\n")
 
 
@@ -335,12 +775,13 @@ def exportFeatureFramesDialogue():
             return False
     else:
         NEWFILE = True
-    if NEWFILE:
-        exportFeatureFrames(unique_selected[0], ofile)
-    else:
-        appendFeatureFrames(unique_selected[0], ofile)
+    with ARProfiler.session("Export feature frames"):
+        if NEWFILE:
+            exportFeatureFrames(unique_selected[0], ofile)
+        else:
+            appendFeatureFrames(unique_selected[0], ofile)
     if len(unique_selected) > 1:
-        FreeCAD.Console.PrintWarning("Multi-part export not yet supported\n")
+        FreeCAD.Console.PrintWarning("Multi-part export not supported, use the assembly export\n")
     FreeCAD.Console.PrintMessage("Feature frames of " + str(unique_selected[0].Label) + " exported to " + str(ofile) + "\n")
 
 
@@ -385,30 +826,373 @@ def exportPartInfoAndFeaturesDialogue():
             return False
     else:
         NEWFILE = True
-    if NEWFILE:
-        exportPartInfo(unique_selected[0], ofile)
-        appendFeatureFrames(unique_selected[0], ofile)
-    else:
-        appendPartInfo(unique_selected[0], ofile)
-        appendFeatureFrames(unique_selected[0], ofile)
+    with ARProfiler.session("Export part info and feature frames"):
+        exportPartInfoAndFeatures(unique_selected[0], ofile,
+                                  append=not NEWFILE)
     if len(unique_selected) > 1:
-        FreeCAD.Console.PrintWarning("Multi-part export not yet supported.\n")
+        FreeCAD.Console.PrintWarning("Multi-part export not supported, use the assembly export\n")
     FreeCAD.Console.PrintMessage("Feature frames of "
                                  + str(unique_selected[0].Label)
                                  + " exported to " + str(ofile) + "\n")
 
 
+def exportAssemblyDialogue():
+    """Spawns a dialogue window for exporting the part info and feature
+    frames of all selected parts, or of every part in the document if
+    nothing is selected."""
+    s = FreeCADGui.Selection.getSelection()
+    if len(s) == 0:
+        parts = getDocumentParts(FreeCAD.ActiveDocument)
+    else:
+        parts = []
+        for item in s:
+            if item not in parts and isinstance(item, Part.Feature):
+                parts.append(item)
+    if len(parts) == 0:
+        FreeCAD.Console.PrintError("No parts to export.")
+        return False
+    textprompt = "Save the part info and feature frames of the assembly"
+    ofile, filt = QtGui.QFileDialog.getSaveFileName(None, textprompt,
+                                                    os.getenv("HOME"),
+                                                    "*.json;;*.jsonl;;*.npz")
+    if ofile == "":
+        # User cancelled
+        return False
+    with ARProfiler.session("Export assembly"):
+        if ofile.lower().endswith(".jsonl") or filt == "*.jsonl":
+            exportAssemblyJSONL(parts, ofile)
+        elif ofile.lower().endswith(".npz") or filt == "*.npz":
+            if not ofile.lower().endswith(".npz"):
+                ofile = ofile + ".npz"
+            frames = getDocumentFrames(FreeCAD.ActiveDocument, parts)
+            exportFrameTransforms(frames, ofile)
+        else:
+            exportAssembly(parts, ofile)
+    FreeCAD.Console.PrintMessage(str(len(parts)) + " parts exported to "
+                                 + str(ofile) + "\n")
+
+
 ###################################################################
 # GUI Commands
 ###################################################################
+# The commands are registered from ARCommands, so that this module is only
+# imported when one of them is first used.
 uidir = os.path.join(FreeCAD.getUserAppDataDir(),
                      "Mod", __workbenchname__, "UI")
 icondir = os.path.join(uidir, "icons")
-spawnClassCommand("ExportPartInfoAndFeaturesDialogueCommand",
-                  exportPartInfoAndFeaturesDialogue,
-                  {"Pixmap": str(os.path.join(icondir, "parttojson.svg")),
-                   "MenuText": "Export info and featureframes",
-                   "ToolTip": "Export part properties (placement, C.O.M) and feature frames"})
+
+
+###################################################################
+# Sampled geometry
+###################################################################
+def _vec(v):
+    return (v.x, v.y, v.z)
+
+
+class EdgeSampler(object):
+    """Points and tangents of an edge sampled once over its parameter range,
+    for fast approximate lookups e.g. while scrubbing a parameter.
+    Also holds the cumulative arc length at each sample, so parameters can
+    be found from distances along the edge by binary search."""
+    def __init__(self, edge, n=256):
+        import numpy as np
+        first, last = edge.ParameterRange
+        self.params = np.linspace(first, last, n)
+        self.points = np.array([_vec(edge.valueAt(t)) for t in self.params])
+        self.tangents = np.array([_vec(edge.tangentAt(t))
+                                  for t in self.params])
+        chords = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        self.lengths = np.concatenate(([0.0], np.cumsum(chords)))
+        # Correct the chord lengths with the integrated length
+        self.length = edge.Length
+        if self.lengths[-1] > 0:
+            self.lengths *= self.length/self.lengths[-1]
+
+    def parameterAtLength(self, length):
+        """Gives the parameter at a distance (mm) along the edge."""
+        import numpy as np
+        return float(np.interp(length, self.lengths, self.params))
+
+    def lengthAtParameter(self, t):
+        """Gives the distance (mm) along the edge at a parameter."""
+        import numpy as np
+        return float(np.interp(t, self.params, self.lengths))
+
+    def parameterAtFraction(self, fraction):
+        """Gives the parameter at a fraction (0-1) of the edge length."""
+        return self.parameterAtLength(fraction*self.length)
+
+    def evenParameters(self, n):
+        """Gives the parameters of n points evenly spaced by arc length,
+        including the end points."""
+        import numpy as np
+        return np.interp(np.linspace(0.0, self.length, n),
+                         self.lengths, self.params).tolist()
+
+    def _interpolate(self, t):
+        import numpy as np
+        i = int(np.clip(np.searchsorted(self.params, t), 1,
+                        len(self.params) - 1))
+        t0, t1 = self.params[i - 1], self.params[i]
+        w = min(max((t - t0)/(t1 - t0), 0.0), 1.0)
+        return i, w
+
+    def at(self, t):
+        """Gives (point, tangent) at parameter t, linearly interpolated."""
+        i, w = self._interpolate(t)
+        p = (1 - w)*self.points[i - 1] + w*self.points[i]
+        d = (1 - w)*self.tangents[i - 1] + w*self.tangents[i]
+        return FreeCAD.Vector(*p.tolist()), FreeCAD.Vector(*d.tolist())
+
+
+class SurfaceSampler(object):
+    """Points and normals of a face sampled once on a grid over its
+    parameter range, for fast approximate lookups e.g. while scrubbing the
+    parameters. The samples are at the cell centers, clear of degenerate
+    boundaries such as sphere poles and cone apexes. Near a sample where the
+    normal is not defined the face is evaluated exactly."""
+    def __init__(self, face, nu=48, nv=48):
+        import numpy as np
+        self.face = face
+        umin, umax, vmin, vmax = face.ParameterRange
+        self.us = umin + (np.arange(nu) + 0.5)*(umax - umin)/nu
+        self.vs = vmin + (np.arange(nv) + 0.5)*(vmax - vmin)/nv
+        self.points = np.zeros((nu, nv, 3))
+        self.normals = np.zeros((nu, nv, 3))
+        self.valid = np.ones((nu, nv), dtype=bool)
+        for i, u in enumerate(self.us):
+            for j, v in enumerate(self.vs):
+                try:
+                    self.points[i, j] = _vec(face.valueAt(u, v))
+                    self.normals[i, j] = _vec(face.normalAt(u, v))
+                except Exception:
+                    self.valid[i, j] = False
+
+    @staticmethod
+    def _cell(params, t):
+        import numpy as np
+        i = int(np.clip(np.searchsorted(params, t), 1, len(params) - 1))
+        w = (t - params[i - 1])/(params[i] - params[i - 1])
+        return i, min(max(w, 0.0), 1.0)
+
+    def _bilinear(self, table, i, wu, j, wv):
+        return ((1 - wu)*(1 - wv)*table[i - 1, j - 1]
+                + wu*(1 - wv)*table[i, j - 1]
+                + (1 - wu)*wv*table[i - 1, j]
+                + wu*wv*table[i, j])
+
+    def at(self, u, v):
+        """Gives (point, normal) at parameters u, v, bilinearly
+        interpolated."""
+        i, wu = self._cell(self.us, u)
+        j, wv = self._cell(self.vs, v)
+        if not self.valid[i - 1:i + 1, j - 1:j + 1].all():
+            return self.face.valueAt(u, v), self.face.normalAt(u, v)
+        p = self._bilinear(self.points, i, wu, j, wv)
+        n = self._bilinear(self.normals, i, wu, j, wv)
+        return FreeCAD.Vector(*p.tolist()), FreeCAD.Vector(*n.tolist())
+
+
+###################################################################
+# Collision geometry
+###################################################################
+# Tessellation tolerance in mm of the collision geometry
+COLLISION_TOLERANCE = 1.0
+
+
+def orientedBoundingBox(points, axes, origin=None):
+    """Gives the box around an N x 3 array of points aligned with the rows
+    of axes (3 x 3, orthonormal), as a dictionary of the box center, the
+    axes and the half extents along each axis."""
+    if origin is None:
+        origin = points.mean(axis=0)
+    local = (points - origin).dot(axes.T)
+    lo = local.min(axis=0)
+    hi = local.max(axis=0)
+    center = origin + (0.5*(lo + hi)).dot(axes)
+    return {"center": center.tolist(),
+            "axes": axes.tolist(),
+            "halfextents": (0.5*(hi - lo)).tolist()}
+
+
+def convexHull(points, eps=None):
+    """Gives the convex hull of an N x 3 array of points as (vertices,
+    triangles), where triangles index vertices counterclockwise seen from
+    outside. scipy.spatial.ConvexHull is used if scipy is installed,
+    otherwise quickhull. Points on the faces of the hull may be kept as
+    vertices. Returns None if the points are in a plane."""
+    import numpy as np
+    points = np.unique(np.asarray(points, dtype=np.float64).reshape((-1, 3)),
+                       axis=0)
+    if len(points) < 4:
+        return None
+    extent = points.max(axis=0) - points.min(axis=0)
+    if eps is None:
+        eps = 1e-9*extent.max()
+    # Initial tetrahedron from extreme points
+    axis = int(np.argmax(extent))
+    i0 = int(np.argmin(points[:, axis]))
+    i1 = int(np.argmax(points[:, axis]))
+    d = points - points[i0]
+    line = (points[i1] - points[i0])/np.linalg.norm(points[i1] - points[i0])
+    i2 = int(np.argmax(np.linalg.norm(np.cross(d, line), axis=1)))
+    normal = np.cross(points[i1] - points[i0], points[i2] - points[i0])
+    if np.linalg.norm(normal) < eps*eps:
+        return None
+    heights = d.dot(normal/np.linalg.norm(normal))
+    i3 = int(np.argmax(np.abs(heights)))
+    if abs(heights[i3]) < eps:
+        return None
+    try:
+        from scipy.spatial import ConvexHull
+    except ImportError:
+        triangles = _quickhull(points, (i0, i1, i2, i3), eps)
+    else:
+        hull = ConvexHull(points)
+        triangles = hull.simplices.copy()
+        tris = points[triangles]
+        normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+        flip = np.einsum("ij,ij->i", normals, hull.equations[:, :3]) < 0
+        triangles[flip] = triangles[flip][:, ::-1]
+    used, triangles = np.unique(triangles, return_inverse=True)
+    return points[used], triangles.reshape((-1, 3))
+
+
+def _quickhull(points, tetrahedron, eps):
+    """Gives the triangles of the convex hull of points, starting from four
+    indices spanning a tetrahedron. The faces seen from a new hull point are
+    found by walking the face adjacency from the face the point is outside
+    of."""
+    import numpy as np
+    interior = points[list(tetrahedron)].mean(axis=0)
+    # Face tables, grown by doubling
+    capacity = [64]
+    tables = {"faces": np.zeros((64, 3), dtype=np.int64),
+              "normals": np.zeros((64, 3)),
+              "offsets": np.zeros(64),
+              "alive": np.zeros(64, dtype=bool)}
+    nfaces = [0]
+    # Face on the left of each directed edge
+    edge_face = {}
+    outside = {}
+
+    def addFaces(tris, orient=False):
+        """Adds the M x 3 triangles, facing away from the interior point if
+        orient is set. Returns the new face indices."""
+        tris = np.array(tris, dtype=np.int64).reshape((-1, 3))
+        corners = points[tris]
+        n = np.cross(corners[:, 1] - corners[:, 0],
+                     corners[:, 2] - corners[:, 0])
+        if orient:
+            flip = np.einsum("ij,ij->i", n, interior - corners[:, 0]) > 0
+            tris[flip] = tris[flip][:, ::-1]
+            n[flip] = -n[flip]
+        n = n/np.linalg.norm(n, axis=1)[:, None]
+        start = nfaces[0]
+        end = start + len(tris)
+        if end > capacity[0]:
+            while end > capacity[0]:
+                capacity[0] *= 2
+            for name, table in list(tables.items()):
+                grown = np.zeros((capacity[0],) + table.shape[1:],
+                                 dtype=table.dtype)
+                grown[:start] = table[:start]
+                tables[name] = grown
+        tables["faces"][start:end] = tris
+        tables["normals"][start:end] = n
+        tables["offsets"][start:end] = np.einsum("ij,ij->i", n, corners[:, 0])
+        tables["alive"][start:end] = True
+        for f, (a, b, c) in enumerate(tris.tolist(), start):
+            edge_face[(a, b)] = f
+            edge_face[(b, c)] = f
+            edge_face[(c, a)] = f
+        nfaces[0] = end
+        return list(range(start, end))
+
+    def assign(idx, face_ids):
+        """Gives each point to the face it is furthest outside of."""
+        if len(idx) == 0:
+            return
+        face_ids = np.asarray(face_ids)
+        dists = (points[idx].dot(tables["normals"][face_ids].T)
+                 - tables["offsets"][face_ids])
+        best = np.argmax(dists, axis=1)
+        above = dists[np.arange(len(idx)), best] > eps
+        for k, f in enumerate(face_ids):
+            sel = idx[above & (best == k)]
+            if len(sel) > 0:
+                outside[int(f)] = sel
+
+    i0, i1, i2, i3 = tetrahedron
+    initial = addFaces([(i0, i1, i2), (i0, i1, i3), (i0, i2, i3),
+                        (i1, i2, i3)], orient=True)
+    rest = np.setdiff1d(np.arange(len(points)), list(tetrahedron))
+    assign(rest, initial)
+    while outside:
+        f, idx = outside.popitem()
+        normals = tables["normals"]
+        offsets = tables["offsets"]
+        eye = int(idx[np.argmax(points[idx].dot(normals[f]) - offsets[f])])
+        eye_point = points[eye]
+        visible = [f]
+        seen = set(visible)
+        horizon = []
+        k = 0
+        while k < len(visible):
+            a, b, c = tables["faces"][visible[k]].tolist()
+            k += 1
+            for edge in ((a, b), (b, c), (c, a)):
+                g = edge_face[(edge[1], edge[0])]
+                if g in seen:
+                    continue
+                if normals[g].dot(eye_point) - offsets[g] > eps:
+                    seen.add(g)
+                    visible.append(g)
+                else:
+                    horizon.append(edge)
+        orphans = [idx]
+        for v in visible:
+            tables["alive"][v] = False
+            a, b, c = tables["faces"][v].tolist()
+            for edge in ((a, b), (b, c), (c, a)):
+                if edge_face.get(edge) == v:
+                    del edge_face[edge]
+            if v in outside:
+                orphans.append(outside.pop(v))
+        new_faces = addFaces([(a, b, eye) for a, b in horizon])
+        orphans = np.concatenate(orphans)
+        assign(orphans[orphans != eye], new_faces)
+    return tables["faces"][:nfaces[0]][tables["alive"][:nfaces[0]]]
+
+
+def getCollisionProps(shape, tolerance=COLLISION_TOLERANCE, scale=1e-3):
+    """Gives the oriented bounding box (see orientedBoundingBox) along the
+    principal axes of inertia, and the convex hull of the tessellation of a
+    shape. Lengths are in m by default."""
+    import numpy as np
+    with ARProfiler.timed("getCollisionProps"):
+        # Mesh a copy, the shape may share its triangulation with the part's
+        # display mesh, and an existing finer mesh would be reused
+        mesh_shape = shape.copy()
+        mesh_shape.clean()
+        points, facets = mesh_shape.tessellate(tolerance)
+        points = np.array([(p.x, p.y, p.z) for p in points],
+                          dtype=np.float64).reshape((-1, 3))*scale
+        pp = shape.PrincipalProperties
+        first = np.array(vector2list(pp["FirstAxisOfInertia"], scale=1))
+        second = np.array(vector2list(pp["SecondAxisOfInertia"], scale=1))
+        # Orthonormal even if the principal axes are not unique
+        first = first/np.linalg.norm(first)
+        second = second - second.dot(first)*first
+        second = second/np.linalg.norm(second)
+        axes = np.array([first, second, np.cross(first, second)])
+        com = np.array(vector2list(shape.CenterOfMass, scale))
+        props = {"orientedboundingbox": orientedBoundingBox(points, axes, com)}
+        hull = convexHull(points)
+        if hull is not None:
+            props["convexhull"] = {"vertices": hull[0].tolist(),
+                                   "triangles": hull[1].tolist()}
+        return props
 
 
 ###################################################################
@@ -416,6 +1200,11 @@ spawnClassCommand("ExportPartInfoAndFeaturesDialogueCommand",
 ###################################################################
 def getPrimitiveInfo(prim_type, subobj, scale=1e-3):
     """returns a dictionary of the primitive's specific information."""
+    with ARProfiler.timed("getPrimitiveInfo"):
+        return _getPrimitiveInfo(prim_type, subobj, scale)
+
+
+def _getPrimitiveInfo(prim_type, subobj, scale):
     d = {}
     if prim_type == "ArcOfCircle":
         d["radius"] = scale*subobj.Curve.Radius
@@ -428,7 +1217,7 @@ def getPrimitiveInfo(prim_type, subobj, scale=1e-3):
         d["majorradius"] = scale*subobj.Curve.MajorRadius
         d["minorradius"] = scale*subobj.Curve.MinorRadius
         d["parameterrange"] = subobj.ParameterRange
-    elif prim_type == "ArcOfHyperBola":
+    elif prim_type == "ArcOfHyperbola":
         d["anglexu"] = subobj.Curve.AngleXU
         d["axis"] = vector2list(subobj.Curve.Axis, scale=1)
         d["center"] = vector2list(subobj.Curve.Center, scale)
@@ -472,7 +1261,7 @@ def getPrimitiveInfo(prim_type, subobj, scale=1e-3):
             sp = subobj.valueAt(subobj.FirstParameter)
             ep = subobj.valueAt(subobj.LastParameter)
             d["startpoint"] = vector2list(sp)
-            d["endpoint"] = vector2list
+            d["endpoint"] = vector2list(ep)
         else:
             if not hasattr(subobj.Curve, "Infinite"):
                 d["startpoint"] = vector2list(subobj.Curve.StartPoint)
@@ -10,13 +10,16 @@ class ARBench(Workbench):
 
     def Initialize(self):
         """This function is executed when FreeCAD starts"""
-        import ARFrames
-        self.framecommands = ["FrameCommand",
-                              "AllPartFramesCommand",
-                              "FeatureFrameCommand"]
-        self.toolcommands = ["ExportPartInfoAndFeaturesDialogueCommand"]
+        import time
+        t0 = time.time()
+        # Only the command metadata, the modules are loaded on first use
+        import ARCommands
+        ARCommands.addCommands()
+        self.framecommands = ARCommands.FRAME_COMMANDS
+        self.toolcommands = ARCommands.TOOL_COMMANDS
         self.appendToolbar("AR Frames", self.framecommands)
         self.appendToolbar("AR Tools", self.toolcommands)
+        ARCommands.reportTiming("Initialize", time.time() - t0)
 
     def Activated(self):
         """This function is executed when the workbench is activated."""